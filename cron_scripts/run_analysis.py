@@ -11,6 +11,7 @@ import os
 from datetime import datetime
 import fcntl
 from math import radians, sin, cos, sqrt, atan2
+import numpy as np
 
 # Add project paths
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,6 +19,7 @@ sys.path.insert(0, project_root)
 sys.path.append(os.path.join(project_root, 'scripts'))
 
 from src.processing.stop_detector import find_stop_events
+from src.processing.haversine_kernels import HAS_NUMBA, nearest_within
 from src.api.database import get_db_connection
 from psycopg2.extras import execute_batch, RealDictCursor
 
@@ -45,7 +47,14 @@ except ImportError as e:
     HAS_SRI_MODULES = False
     print(f"Warning: Missing module - {e}")
 
+try:
+    from sklearn.neighbors import BallTree
+    HAS_SKLEARN = True
+except ImportError:
+    HAS_SKLEARN = False
+
 LOCK_FILE = '/tmp/pt_analysis.lock'
+BALLTREE_MIN_STOPS = 64  # Below this a vectorized scan beats building/querying a tree
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """Calculate distance in meters between two points"""
@@ -60,6 +69,30 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     
     return R * c
 
+def haversine_distance_vec(lat, lon, lats, lons):
+    """Vectorized haversine_distance from one point to arrays of points (meters)"""
+    R = 6371000  # Earth radius in meters
+    
+    lat1, lon1 = radians(lat), radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    
+    a = np.sin(dlat/2)**2 + cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    
+    return R * c
+
+def _stop_arrays(stops):
+    """Pack (naptan_id, stop_name, lat, lon) tuples into parallel arrays for vectorized distance checks"""
+    naptan_ids, stop_names, lats, lons = zip(*stops)
+    return {
+        'naptan_ids': list(naptan_ids),
+        'stop_names': list(stop_names),
+        'lats': np.array(lats, dtype=np.float64),
+        'lons': np.array(lons, dtype=np.float64)
+    }
+
 class StopMatcher:
     """In-memory stop matcher - loads once, matches fast"""
     
@@ -84,29 +117,30 @@ class StopMatcher:
               AND s.longitude IS NOT NULL
         """)
         
-        # Build index: route_name -> direction -> [stops]
-        self.route_stops = {}
+        # Build index: (route_name, direction) -> [(naptan_id, stop_name, lat, lon)]
+        grouped = {}
         for row in cur.fetchall():
-            route = row['route_name']
-            direction = row['direction']
+            key = (row['route_name'], row['direction'])
+            stop = (row['naptan_id'], row['stop_name'], float(row['latitude']), float(row['longitude']))
             
-            if route not in self.route_stops:
-                self.route_stops[route] = {}
-            if direction not in self.route_stops[route]:
-                self.route_stops[route][direction] = []
-            
-            self.route_stops[route][direction].append({
-                'naptan_id': row['naptan_id'],
-                'stop_name': row['stop_name'],
-                'lat': float(row['latitude']),
-                'lon': float(row['longitude'])
-            })
+            stops = grouped.get(key)
+            if stops is None:
+                grouped[key] = [stop]
+            else:
+                stops.append(stop)
         
         cur.close()
         
-        total_routes = len(self.route_stops)
-        total_stops = sum(len(stops) for dirs in self.route_stops.values() 
-                         for stops in dirs.values())
+        # Freeze each route/direction into arrays; "all directions" is used when direction is unknown
+        all_directions = {}
+        for (route, direction), stops in grouped.items():
+            all_directions.setdefault(route, []).extend(stops)
+        
+        self.route_stops = {key: _stop_arrays(stops) for key, stops in grouped.items()}
+        self.route_all_stops = {route: _stop_arrays(stops) for route, stops in all_directions.items()}
+        
+        total_routes = len(self.route_all_stops)
+        total_stops = sum(len(stops) for stops in grouped.values())
         print(f"✓ Loaded {total_stops} stops across {total_routes} routes")
     
     def match(self, stop_event, radius_m=30.0):
@@ -118,31 +152,39 @@ class StopMatcher:
         route_name = stop_event.get('route_name')
         direction = stop_event.get('direction')
         
-        if not route_name or route_name not in self.route_stops:
+        if not route_name or route_name not in self.route_all_stops:
             return None
         
         # Get candidate stops for this route+direction
-        candidates = []
+        candidates = None
         
-        if direction and direction in self.route_stops[route_name]:
-            candidates = self.route_stops[route_name][direction]
+        if direction:
+            candidates = self.route_stops.get((route_name, direction))
         elif direction is None:
             # No direction - check all directions for this route
-            for dir_stops in self.route_stops[route_name].values():
-                candidates.extend(dir_stops)
+            candidates = self.route_all_stops[route_name]
         
-        if not candidates:
+        if not candidates or not candidates['naptan_ids']:
             return None
         
         # Find nearest stop within radius
+        if HAS_SKLEARN and len(candidates['naptan_ids']) >= BALLTREE_MIN_STOPS:
+            idx, best_distance = self._nearest_balltree(candidates, lat, lon)
+        elif HAS_NUMBA:
+            idx, best_distance = nearest_within(lat, lon, candidates['lats'], candidates['lons'], radius_m)
+            if idx < 0:
+                return None
+        else:
+            distances = haversine_distance_vec(lat, lon, candidates['lats'], candidates['lons'])
+            idx = int(np.argmin(distances))
+            best_distance = float(distances[idx])
         best_stop = None
-        best_distance = radius_m
         
-        for stop in candidates:
-            distance = haversine_distance(lat, lon, stop['lat'], stop['lon'])
-            if distance < best_distance:
-                best_distance = distance
-                best_stop = stop
+        if best_distance < radius_m:
+            best_stop = {
+                'naptan_id': candidates['naptan_ids'][idx],
+                'stop_name': candidates['stop_names'][idx]
+            }
         
         if best_stop:
             return {
@@ -157,6 +199,16 @@ class StopMatcher:
             }
         
         return None
+    
+    def _nearest_balltree(self, candidates, lat, lon):
+        """O(log n) nearest stop via a haversine BallTree, built on first use per candidate set"""
+        tree = candidates.get('tree')
+        if tree is None:
+            tree = BallTree(np.radians(np.column_stack([candidates['lats'], candidates['lons']])), metric='haversine')
+            candidates['tree'] = tree
+        
+        dist, ind = tree.query(np.radians([[lat, lon]]), k=1)
+        return int(ind[0, 0]), float(dist[0, 0]) * 6371000
 
 def detect_and_match_stops():
     """Find stop events and match - OPTIMIZED VERSION"""
@@ -252,6 +304,8 @@ def detect_and_match_stops():
                 ON vehicle_arrivals(direction);
                 CREATE INDEX IF NOT EXISTS idx_arrivals_operator
                 ON vehicle_arrivals(operator);
+                CREATE INDEX IF NOT EXISTS idx_arrivals_ts_brin
+                ON vehicle_arrivals USING brin(timestamp);
             """)
             
             values = [
@@ -8,7 +8,7 @@ from datetime import datetime
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from src.api.database import get_db_connection
+from src.api.database import get_db_connection, bump_data_version
 from psycopg2.extras import execute_batch
 
 def aggregate_dwell_times():
@@ -40,6 +40,9 @@ def aggregate_dwell_times():
             CREATE INDEX IF NOT EXISTS idx_dta_high_demand 
             ON dwell_time_analysis(avg_dwell_seconds DESC) 
             WHERE sample_count > 10;
+            
+            -- Served the old MAX(last_updated) ETag; the API now reads data_version
+            DROP INDEX IF EXISTS idx_dta_last_updated;
         """)
         
         # Aggregate new arrivals
@@ -78,6 +81,8 @@ def aggregate_dwell_times():
         cur.execute("DELETE FROM vehicle_arrivals WHERE dwell_time_seconds IS NOT NULL")
         deleted = cur.rowcount
         
+        # Invalidates the dwell-time API ETags in the same commit as the new aggregates
+        bump_data_version(cur)
         conn.commit()
         
         print(f"✓ Aggregated {aggregated} dwell time records")
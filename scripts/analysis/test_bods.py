@@ -14,6 +14,14 @@ BODS_API_KEY = os.getenv("BODS_API_KEY")
 LIVERPOOL_BBOX = "-3.05,53.35,-2.85,53.48"
 SIRI_URL = f"https://data.bus-data.dft.gov.uk/api/v1/datafeed/?api_key={BODS_API_KEY}&boundingBox={LIVERPOOL_BBOX}"
 
+
+def index_by_localname(element):
+    """Map each local tag name under element to its first occurrence, in one pass"""
+    index = {}
+    for child in element.iter():
+        index.setdefault(child.tag.rpartition('}')[2], child)
+    return index
+
 print("Fetching SIRI-VM feed from BODS...")
 print("="*80)
 
@@ -42,104 +50,107 @@ try:
         print(f"VEHICLE {i}")
         print("-"*80)
         
+        # One walk of the activity instead of a descendant search per field
+        fields = index_by_localname(vehicle_activity)
+        
         # Recorded at time
-        recorded_at = vehicle_activity.find('.//siri:RecordedAtTime', ns)
+        recorded_at = fields.get('RecordedAtTime')
         if recorded_at is not None:
             print(f"Recorded At: {recorded_at.text}")
         
         # Vehicle monitoring reference (typically the entity ID)
-        item_id = vehicle_activity.find('.//siri:ItemIdentifier', ns)
+        item_id = fields.get('ItemIdentifier')
         if item_id is not None:
             print(f"Item ID: {item_id.text}")
         
         # Valid until time
-        valid_until = vehicle_activity.find('.//siri:ValidUntilTime', ns)
+        valid_until = fields.get('ValidUntilTime')
         if valid_until is not None:
             print(f"Valid Until: {valid_until.text}")
         
         # Monitored vehicle journey
-        mvj = vehicle_activity.find('.//siri:MonitoredVehicleJourney', ns)
+        mvj = fields.get('MonitoredVehicleJourney')
         
         if mvj is not None:
             print("\nMonitored Vehicle Journey:")
             
             # Line ref (route number)
-            line_ref = mvj.find('siri:LineRef', ns)
+            line_ref = fields.get('LineRef')
             if line_ref is not None:
                 print(f"  Line Ref: {line_ref.text}")
             
             # Direction ref - THIS IS WHAT WE'RE LOOKING FOR
-            direction_ref = mvj.find('siri:DirectionRef', ns)
+            direction_ref = fields.get('DirectionRef')
             if direction_ref is not None:
                 print(f"  ✓ Direction Ref: {direction_ref.text}")
             else:
                 print(f"  ✗ Direction Ref: NOT PROVIDED")
             
             # Published line name
-            published_line = mvj.find('siri:PublishedLineName', ns)
+            published_line = fields.get('PublishedLineName')
             if published_line is not None:
                 print(f"  Published Line Name: {published_line.text}")
             
             # Operator ref
-            operator_ref = mvj.find('siri:OperatorRef', ns)
+            operator_ref = fields.get('OperatorRef')
             if operator_ref is not None:
                 print(f"  Operator Ref: {operator_ref.text}")
             
             # Origin name
-            origin_name = mvj.find('siri:OriginName', ns)
+            origin_name = fields.get('OriginName')
             if origin_name is not None:
                 print(f"  Origin Name: {origin_name.text}")
             
             # Destination name
-            destination_name = mvj.find('siri:DestinationName', ns)
+            destination_name = fields.get('DestinationName')
             if destination_name is not None:
                 print(f"  Destination Name: {destination_name.text}")
             
             # Origin aimed departure time
-            origin_aimed = mvj.find('siri:OriginAimedDepartureTime', ns)
+            origin_aimed = fields.get('OriginAimedDepartureTime')
             if origin_aimed is not None:
                 print(f"  Origin Aimed Departure: {origin_aimed.text}")
             
             # Vehicle location
-            vehicle_location = mvj.find('siri:VehicleLocation', ns)
+            vehicle_location = fields.get('VehicleLocation')
             if vehicle_location is not None:
-                longitude = vehicle_location.find('siri:Longitude', ns)
-                latitude = vehicle_location.find('siri:Latitude', ns)
+                longitude = fields.get('Longitude')
+                latitude = fields.get('Latitude')
                 if longitude is not None and latitude is not None:
                     print(f"  Location: {latitude.text}, {longitude.text}")
             
             # Bearing
-            bearing = mvj.find('siri:Bearing', ns)
+            bearing = fields.get('Bearing')
             if bearing is not None:
                 print(f"  Bearing: {bearing.text}°")
             
             # Block ref
-            block_ref = mvj.find('siri:BlockRef', ns)
+            block_ref = fields.get('BlockRef')
             if block_ref is not None:
                 print(f"  Block Ref: {block_ref.text}")
             
             # Vehicle ref
-            vehicle_ref = mvj.find('siri:VehicleRef', ns)
+            vehicle_ref = fields.get('VehicleRef')
             if vehicle_ref is not None:
                 print(f"  Vehicle Ref: {vehicle_ref.text}")
             
             # Journey ref (trip ID)
-            journey_ref = mvj.find('siri:FramedVehicleJourneyRef/siri:DatedVehicleJourneyRef', ns)
+            journey_ref = fields.get('DatedVehicleJourneyRef')
             if journey_ref is not None:
                 print(f"  Journey Ref: {journey_ref.text}")
             
             # Monitored (is being tracked)
-            monitored = mvj.find('siri:Monitored', ns)
+            monitored = fields.get('Monitored')
             if monitored is not None:
                 print(f"  Monitored: {monitored.text}")
             
             # In congestion
-            in_congestion = mvj.find('siri:InCongestion', ns)
+            in_congestion = fields.get('InCongestion')
             if in_congestion is not None:
                 print(f"  In Congestion: {in_congestion.text}")
             
             # Occupancy
-            occupancy = mvj.find('siri:Occupancy', ns)
+            occupancy = fields.get('Occupancy')
             if occupancy is not None:
                 print(f"  Occupancy: {occupancy.text}")
         
@@ -40,27 +40,19 @@ def cleanup_old_data():
         # ========================================================================
         print("\n1. Cleaning vehicle_positions...")
         
-        cur.execute("SELECT COUNT(*) FROM vehicle_positions")
-        before_positions = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM vehicle_positions WHERE analyzed = true")
-        total_analyzed = cur.fetchone()[0]
-        
-        print(f"   Before: {before_positions:,} positions ({total_analyzed:,} analyzed)")
-        
-        # Count what will be deleted
+        # Totals and what will be deleted, in one scan
         cur.execute("""
             SELECT 
-                COUNT(*) FILTER (WHERE analyzed = true) as analyzed_count,
-                COUNT(*) FILTER (WHERE analyzed = false) as unanalyzed_count
+                COUNT(*) as total_count,
+                COUNT(*) FILTER (WHERE analyzed = true) as total_analyzed,
+                COUNT(*) FILTER (WHERE analyzed = true AND timestamp < NOW() - INTERVAL '15 minutes') as analyzed_count,
+                COUNT(*) FILTER (WHERE analyzed = false AND timestamp < NOW() - INTERVAL '30 minutes') as unanalyzed_count
             FROM vehicle_positions
-            WHERE (analyzed = true AND timestamp < NOW() - INTERVAL '15 minutes')
-               OR (analyzed = false AND timestamp < NOW() - INTERVAL '30 minutes')
         """)
         
-        result = cur.fetchone()
-        analyzed_to_delete = result[0] if result else 0
-        unanalyzed_to_delete = result[1] if result else 0
+        before_positions, total_analyzed, analyzed_to_delete, unanalyzed_to_delete = cur.fetchone()
+        
+        print(f"   Before: {before_positions:,} positions ({total_analyzed:,} analyzed)")
         
         # Delete old data
         cur.execute("""
@@ -83,15 +75,13 @@ def cleanup_old_data():
         # ========================================================================
         print("\n2. Cleaning vehicle_arrivals...")
         
-        cur.execute("SELECT COUNT(*) FROM vehicle_arrivals")
-        old_arrivals = cur.fetchone()[0]
+        # These should already be aggregated by aggregate_dwell_times.py
+        # This is a safety cleanup for any stragglers
+        cur.execute("DELETE FROM vehicle_arrivals WHERE timestamp < NOW() - INTERVAL '1 hour'")
+        deleted = cur.rowcount
+        conn.commit()
         
-        if old_arrivals > 0:
-            # These should already be aggregated by aggregate_dwell_times.py
-            # This is a safety cleanup for any stragglers
-            cur.execute("DELETE FROM vehicle_arrivals WHERE timestamp < NOW() - INTERVAL '1 hour'")
-            deleted = cur.rowcount
-            conn.commit()
+        if deleted > 0:
             print(f"   Deleted: {deleted:,} arrivals (>1 hour)")
         else:
             print(f"   No old arrivals to clean")
@@ -101,18 +91,17 @@ def cleanup_old_data():
         # ========================================================================
         print("\n3. Dwell time analysis (fixed size - no cleanup needed)...")
         
-        cur.execute("SELECT COUNT(*) FROM dwell_time_analysis")
-        dwell_rows = cur.fetchone()[0]
+        cur.execute("""
+            SELECT 
+                COUNT(*) as dwell_rows,
+                COUNT(DISTINCT route_name) as routes,
+                COUNT(DISTINCT naptan_id) as stops,
+                SUM(sample_count) as total_samples
+            FROM dwell_time_analysis
+        """)
+        dwell_rows, *stats = cur.fetchone()
         
         if dwell_rows > 0:
-            cur.execute("""
-                SELECT 
-                    COUNT(DISTINCT route_name) as routes,
-                    COUNT(DISTINCT naptan_id) as stops,
-                    SUM(sample_count) as total_samples
-                FROM dwell_time_analysis
-            """)
-            stats = cur.fetchone()
             print(f"   {dwell_rows:,} aggregated records")
             print(f"   {stats[0]} routes, {stats[1]} stops, {stats[2]:,} samples")
             print(f"   ✓ FIXED SIZE - updates existing rows only")
@@ -124,13 +113,9 @@ def cleanup_old_data():
         print("Running VACUUM to reclaim disk space...")
         
         conn.commit()
-        cur.close()
-        conn.close()
         
-        # Reconnect with autocommit for VACUUM
-        conn = psycopg2.connect(**DB_CONFIG)
-        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-        cur = conn.cursor()
+        # VACUUM can't run inside a transaction - switch this connection to autocommit
+        conn.autocommit = True
         
         cur.execute("VACUUM vehicle_positions")
         cur.execute("VACUUM vehicle_arrivals")
@@ -3,10 +3,14 @@ Optimized BODS SIRI-VM polling and ingestion
 Fetches vehicle positions every 10 seconds with direction and route info
 """
 
+import io
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
+from functools import lru_cache
 import psycopg2
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
@@ -18,6 +22,19 @@ BODS_API_KEY = os.getenv("BODS_API_KEY")
 LIVERPOOL_BBOX = "-3.05,53.35,-2.85,53.48"
 SIRI_URL = f"https://data.bus-data.dft.gov.uk/api/v1/datafeed/?api_key={BODS_API_KEY}&boundingBox={LIVERPOOL_BBOX}"
 
+# Cron starts a fresh poller every 10 seconds, so a poll (retry included) must finish inside that.
+# One quick retry on transient 5xx/connection errors; 429 is not retried - BODS is throttling us.
+POLL_TIMEOUT = (3, 5)  # (connect, read) seconds
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    max_retries=Retry(
+        total=1,
+        backoff_factor=0,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+    )
+))
+
 # Database Configuration
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -31,52 +48,71 @@ DB_CONFIG = {
 NS = {
     'siri': 'http://www.siri.org.uk/siri'
 }
+SIRI = f"{{{NS['siri']}}}"
+VEHICLE_ACTIVITY_TAG = SIRI + 'VehicleActivity'
+
+# Precomputed Clark-notation paths: single-tag lookups skip ElementPath entirely
+MVJ_PATH = './/' + SIRI + 'MonitoredVehicleJourney'
+RECORDED_AT_PATH = './/' + SIRI + 'RecordedAtTime'
+LONGITUDE_PATH = SIRI + 'VehicleLocation/' + SIRI + 'Longitude'
+LATITUDE_PATH = SIRI + 'VehicleLocation/' + SIRI + 'Latitude'
+BEARING_PATH = SIRI + 'Bearing'
+
+# Optional text fields under MonitoredVehicleJourney, by output key
+MVJ_TEXT_FIELDS = {
+    'vehicle_id': SIRI + 'VehicleRef',
+    'route_name': SIRI + 'LineRef',
+    'direction': SIRI + 'DirectionRef',
+    'operator': SIRI + 'OperatorRef',
+    'origin': SIRI + 'OriginName',
+    'destination': SIRI + 'DestinationName',
+    'trip_id': SIRI + 'FramedVehicleJourneyRef/' + SIRI + 'DatedVehicleJourneyRef',
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_recorded_at(text):
+    """Parse a SIRI RecordedAtTime; many vehicles in one poll share the same value"""
+    return datetime.fromisoformat(text.replace('Z', '+00:00'))
+
+
+def iter_vehicle_activities(content):
+    """Yield each VehicleActivity as soon as it is parsed, freeing its subtree afterwards"""
+    for _, element in ET.iterparse(io.BytesIO(content)):
+        if element.tag == VEHICLE_ACTIVITY_TAG:
+            yield element
+            element.clear()
 
 
 def fetch_vehicle_positions():
     """Fetch vehicle positions from BODS SIRI-VM API"""
     try:
-        response = requests.get(SIRI_URL, timeout=30)
+        response = SESSION.get(SIRI_URL, timeout=POLL_TIMEOUT)
         response.raise_for_status()
         
-        root = ET.fromstring(response.content)
-        vehicle_activities = root.findall('.//siri:VehicleActivity', NS)
-        
         vehicles = []
         now = datetime.now(tz=None)  # Current time for age comparison
         max_age = timedelta(minutes=5)  # Skip positions older than 5 minutes
         
-        for activity in vehicle_activities:
-            mvj = activity.find('.//siri:MonitoredVehicleJourney', NS)
+        # Stream the feed instead of building the whole DOM up front
+        for activity in iter_vehicle_activities(response.content):
+            mvj = activity.find(MVJ_PATH)
             
             if mvj is None:
                 continue
             
             # Extract location
-            vehicle_location = mvj.find('siri:VehicleLocation', NS)
-            if vehicle_location is None:
-                continue
-            
-            longitude = vehicle_location.find('siri:Longitude', NS)
-            latitude = vehicle_location.find('siri:Latitude', NS)
+            longitude = mvj.findtext(LONGITUDE_PATH)
+            latitude = mvj.findtext(LATITUDE_PATH)
             
-            if longitude is None or latitude is None:
+            if not longitude or not latitude:
                 continue
             
-            # Extract all available fields
-            vehicle_ref = mvj.find('siri:VehicleRef', NS)
-            line_ref = mvj.find('siri:LineRef', NS)
-            direction_ref = mvj.find('siri:DirectionRef', NS)
-            operator_ref = mvj.find('siri:OperatorRef', NS)
-            origin_name = mvj.find('siri:OriginName', NS)
-            destination_name = mvj.find('siri:DestinationName', NS)
-            bearing = mvj.find('siri:Bearing', NS)
-            recorded_at = activity.find('.//siri:RecordedAtTime', NS)
-            journey_ref = mvj.find('siri:FramedVehicleJourneyRef/siri:DatedVehicleJourneyRef', NS)
+            recorded_at = activity.findtext(RECORDED_AT_PATH)
             
             # Parse timestamp
-            if recorded_at is not None:
-                timestamp = datetime.fromisoformat(recorded_at.text.replace('Z', '+00:00'))
+            if recorded_at:
+                timestamp = parse_recorded_at(recorded_at)
                 # Make timezone-naive for comparison
                 timestamp_naive = timestamp.replace(tzinfo=None)
             else:
@@ -88,19 +124,13 @@ def fetch_vehicle_positions():
             if position_age > max_age:
                 continue
             
-            vehicle_data = {
-                'vehicle_id': vehicle_ref.text if vehicle_ref is not None else None,
-                'route_name': line_ref.text if line_ref is not None else None,
-                'direction': direction_ref.text if direction_ref is not None else None,
-                'operator': operator_ref.text if operator_ref is not None else None,
-                'origin': origin_name.text if origin_name is not None else None,
-                'destination': destination_name.text if destination_name is not None else None,
-                'latitude': float(latitude.text),
-                'longitude': float(longitude.text),
-                'bearing': float(bearing.text) if bearing is not None else None,
-                'timestamp': timestamp,
-                'trip_id': journey_ref.text if journey_ref is not None else None
-            }
+            # Extract all available fields (empty elements count as missing)
+            vehicle_data = {key: mvj.findtext(path) or None for key, path in MVJ_TEXT_FIELDS.items()}
+            bearing = mvj.findtext(BEARING_PATH)
+            vehicle_data['latitude'] = float(latitude)
+            vehicle_data['longitude'] = float(longitude)
+            vehicle_data['bearing'] = float(bearing) if bearing else None
+            vehicle_data['timestamp'] = timestamp
             
             vehicles.append(vehicle_data)
         
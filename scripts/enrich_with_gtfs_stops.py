@@ -3,8 +3,9 @@ Enrich TransXChange data with GTFS Static stop coordinates
 Uses stops.txt from GTFS Static data
 """
 
-import json
+import orjson
 import csv
+import os
 
 # Load the TransXChange JSON
 input_file = "C:/Users/justi/Work/Personal/pt-analytics/static/liverpool_transit_data.json"
@@ -12,8 +13,8 @@ output_file = "C:/Users/justi/Work/Personal/pt-analytics/static/liverpool_transi
 gtfs_stops_file = "C:/Users/justi/Work/Personal/pt-analytics/static/stops.txt"
 
 print("Loading TransXChange JSON...")
-with open(input_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+with open(input_file, 'rb') as f:
+    data = orjson.loads(f.read())
 
 print(f"Total stops in TransXChange: {len(data['stops'])}")
 
@@ -81,10 +82,12 @@ print(f"Still missing coordinates: {still_missing}")
 
 # Save enriched data
 print(f"\nWriting enriched data to: {output_file}")
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(data, f, indent=2, ensure_ascii=False)
+# Temp file + swap, so readers never see a half-written file
+tmp_file = f"{output_file}.tmp"
+with open(tmp_file, 'wb') as f:
+    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+os.replace(tmp_file, output_file)
 
-import os
 file_size_mb = os.path.getsize(output_file) / (1024 * 1024)
 print(f"Output file size: {file_size_mb:.2f} MB")
 
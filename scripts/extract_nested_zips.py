@@ -3,68 +3,156 @@ Extract nested zip files from BODS TransXChange download
 Handles: main.zip -> operator_zips/ -> xml_files/
 """
 
+import io
 import zipfile
 import os
-from pathlib import Path
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+
+try:
+    import deflate
+    HAS_DEFLATE = True
+except ImportError:
+    HAS_DEFLATE = False
 
 # Configuration
 MAIN_ZIP = "C:/Users/justi/Work/Personal/pt-analytics/static/transxchange_downloads/compresed.zip"  # Update this path
 OUTPUT_DIR = "C:/Users/justi/Work/Personal/pt-analytics/static/transxchange_downloads"
-TEMP_DIR = "C:/Users/justi/Work/Personal/pt-analytics/static/temp_zips"
+MAX_WORKERS = os.cpu_count()  # Operator zips inflated in parallel, one process per core
+COPY_BUFSIZE = 1 << 20  # XML members are inflated to disk in 1 MiB blocks
+SHARD_BYTES = 32 << 20  # Operator zips bigger than this are split across several workers
+LIBDEFLATE_MAX_BYTES = 8 << 20  # libdeflate inflates in one shot; bigger XML streams through zlib instead
+
+def inflate_member(zip_file, info):
+    """Inflate one DEFLATE member of an open zip file object with libdeflate, checking its CRC"""
+    zip_file.seek(info.header_offset)
+    header = zip_file.read(30)
+    signature, = struct.unpack_from('<4s', header)
+    if signature != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local file header for {info.filename!r}")
+    
+    name_len, extra_len = struct.unpack_from('<HH', header, 26)
+    zip_file.seek(name_len + extra_len, os.SEEK_CUR)
+    data = deflate.deflate_decompress(zip_file.read(info.compress_size), info.file_size)
+    
+    if zlib.crc32(data) != info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+    return data
+
+def use_libdeflate(info):
+    """Plain (unencrypted) DEFLATE members small enough to inflate in one shot"""
+    return (HAS_DEFLATE and info.compress_type == zipfile.ZIP_DEFLATED
+            and not info.flag_bits & 0x1 and info.file_size <= LIBDEFLATE_MAX_BYTES)
+
+def extract_operator_zip(zip_file, output_dir, shard=0, shard_count=1):
+    """Extract the XML files from one open operator zip file object, returns how many were written"""
+    with zipfile.ZipFile(zip_file, 'r') as nested_zip:
+        # Extract only XML files, and only this worker's slice of them
+        xml_files = [info for info in nested_zip.infolist() if info.filename.lower().endswith('.xml')]
+        xml_files = xml_files[shard::shard_count]
+        
+        for info in xml_files:
+            # Same path sanitising as ZipFile.extract: no absolute paths or parent references
+            parts = [p for p in info.filename.replace('\\', '/').split('/') if p not in ('', '.', '..')]
+            target = os.path.join(output_dir, *parts)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            
+            if use_libdeflate(info):
+                with open(target, 'wb') as dst:
+                    dst.write(inflate_member(zip_file, info))
+                continue
+            
+            # Stream to output directory
+            with nested_zip.open(info) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+    
+    return len(xml_files)
 
-def extract_nested_zips(main_zip_path, output_dir, temp_dir):
+def extract_nested_member(main_zip_path, member_name, output_dir):
+    """Worker: read one operator zip out of the main zip and extract all of it"""
+    # Each process opens its own handle, so nested zips never cross the process boundary
+    with zipfile.ZipFile(main_zip_path, 'r') as main_zip:
+        zip_bytes = main_zip.read(member_name)
+    
+    return extract_operator_zip(io.BytesIO(zip_bytes), output_dir)
+
+def extract_spooled_shard(zip_path, output_dir, shard, shard_count):
+    """Worker: extract one slice of an operator zip already spooled to disk"""
+    with open(zip_path, 'rb') as zip_file:
+        return extract_operator_zip(zip_file, output_dir, shard, shard_count)
+
+def spool_member(main_zip, info, spool_dir):
+    """Inflate one operator zip out of the main zip to a temp file, returns its path"""
+    fd, path = tempfile.mkstemp(suffix='.zip', dir=spool_dir)
+    with main_zip.open(info) as src, os.fdopen(fd, 'wb') as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+    return path
+
+def extract_nested_zips(main_zip_path, output_dir, max_workers=MAX_WORKERS):
     """Extract all XML files from nested zip structure"""
     
     os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(temp_dir, exist_ok=True)
     
     print(f"Extracting from: {main_zip_path}")
     print(f"Output directory: {output_dir}")
     print("="*80)
     
-    # Step 1: Extract main zip
-    print("\nStep 1: Extracting main zip file...")
     with zipfile.ZipFile(main_zip_path, 'r') as main_zip:
-        main_zip.extractall(temp_dir)
-    print(f"  ✓ Extracted to {temp_dir}")
-    
-    # Step 2: Find and extract nested zips
-    print("\nStep 2: Finding nested zip files...")
-    nested_zips = list(Path(temp_dir).rglob("*.zip"))
-    print(f"  Found {len(nested_zips)} operator zip files")
+        print("\nFinding nested zip files...")
+        nested_zips = [info for info in main_zip.infolist() if info.filename.lower().endswith('.zip')]
+        print(f"  Found {len(nested_zips)} operator zip files")
     
     xml_count = 0
     
-    for i, zip_path in enumerate(nested_zips, 1):
-        operator_name = zip_path.stem
-        print(f"\n  [{i}/{len(nested_zips)}] Processing: {operator_name}")
+    # Nested zips are independent, so each one is inflated in its own process.
+    # Large ones are sharded by member so a single big operator doesn't serialise the tail;
+    # they are inflated out of the main zip once, to a temp file every shard reads from.
+    with tempfile.TemporaryDirectory(dir=output_dir) as spool_dir, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [None] * len(nested_zips)
+        sharded = []
+        for i, info in enumerate(nested_zips):
+            shard_count = max(1, min(max_workers, -(-info.file_size // SHARD_BYTES)))
+            if shard_count > 1:
+                sharded.append((i, info, shard_count))
+            else:
+                futures[i] = [executor.submit(extract_nested_member, main_zip_path, info.filename, output_dir)]
         
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as nested_zip:
-                # Extract only XML files
-                xml_files = [f for f in nested_zip.namelist() if f.lower().endswith('.xml')]
-                
-                for xml_file in xml_files:
-                    # Extract to output directory
-                    nested_zip.extract(xml_file, output_dir)
-                    xml_count += 1
-                
-                print(f"    ✓ Extracted {len(xml_files)} XML files")
+        # Small zips are already queued, so the workers stay busy while the big ones are spooled
+        with zipfile.ZipFile(main_zip_path, 'r') as main_zip:
+            for i, info, shard_count in sharded:
+                try:
+                    zip_path = spool_member(main_zip, info, spool_dir)
+                except Exception as e:
+                    # Reported with this operator below rather than aborting the whole run
+                    futures[i] = [Future()]
+                    futures[i][0].set_exception(e)
+                    continue
+                futures[i] = [
+                    executor.submit(extract_spooled_shard, zip_path, output_dir, shard, shard_count)
+                    for shard in range(shard_count)
+                ]
         
-        except Exception as e:
-            print(f"    ✗ Error: {e}")
+        for i, (info, shards) in enumerate(zip(nested_zips, futures), 1):
+            operator_name = info.filename.rpartition('/')[2][:-len('.zip')]
+            print(f"\n  [{i}/{len(nested_zips)}] Processing: {operator_name}")
+            
+            try:
+                extracted = sum(future.result() for future in shards)
+                xml_count += extracted
+                print(f"    ✓ Extracted {extracted} XML files")
+            
+            except Exception as e:
+                print(f"    ✗ Error: {e}")
     
     print("\n" + "="*80)
     print(f"EXTRACTION COMPLETE")
     print(f"  Total XML files extracted: {xml_count}")
     print(f"  Location: {output_dir}")
     print("="*80)
-    
-    # Cleanup temp directory
-    print("\nCleaning up temporary files...")
-    import shutil
-    shutil.rmtree(temp_dir)
-    print("  ✓ Cleanup complete")
 
 if __name__ == "__main__":
-    extract_nested_zips(MAIN_ZIP, OUTPUT_DIR, TEMP_DIR)
\ No newline at end of file
+    extract_nested_zips(MAIN_ZIP, OUTPUT_DIR)
@@ -9,7 +9,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.api.database import get_db_connection
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 OPERATOR_CODE_MAP = {
     'A2BV': 'Arriva',
@@ -96,41 +96,34 @@ def fix_all_operators():
     # 1. Fix vehicle_arrivals
     print("\n1. Fixing vehicle_arrivals...")
     
-    # Map codes to names
-    for code, name in OPERATOR_CODE_MAP.items():
-        cur.execute("""
-            UPDATE vehicle_arrivals
-            SET operator = %s
-            WHERE operator = %s
-        """, (name, code))
-        
-        if cur.rowcount > 0:
-            print(f"   {code:10} → {name:20} ({cur.rowcount} records)")
-            total_fixed += cur.rowcount
-    
-    # Fix Unknown from vehicle_positions
-    cur.execute("""
+    # Fix Unknown from vehicle_positions, mapping codes to names in the same write
+    execute_values(cur, """
         UPDATE vehicle_arrivals va
-        SET operator = CASE 
-            WHEN vp.operator IN ('A2BV', 'AMSY', 'ANWE') THEN 'Arriva'
-            WHEN vp.operator IN ('SCMY', 'SCMR') THEN 'Stagecoach'
-            WHEN vp.operator IN ('FECS', 'FESX') THEN 'First Bus'
-            WHEN vp.operator = 'NATX' THEN 'National Express'
-            WHEN vp.operator = 'HATT' THEN 'Hattons'
-            WHEN vp.operator IN ('HUYT', 'HTL') THEN 'Huyton Travel'
-            ELSE vp.operator
-        END
+        SET operator = COALESCE(m.name, vp.operator)
         FROM vehicle_positions vp
+        LEFT JOIN (VALUES %s) AS m(code, name) ON m.code = vp.operator
         WHERE va.vehicle_id = vp.vehicle_id
           AND ABS(EXTRACT(EPOCH FROM (va.timestamp - vp.timestamp))) < 120
           AND va.operator = 'Unknown'
           AND vp.operator IS NOT NULL
-    """)
+    """, list(OPERATOR_CODE_MAP.items()), page_size=len(OPERATOR_CODE_MAP))
     
     if cur.rowcount > 0:
         print(f"   Unknown → mapped      ({cur.rowcount} records)")
         total_fixed += cur.rowcount
     
+    # Map codes already stored on arrivals to names
+    for code, name in OPERATOR_CODE_MAP.items():
+        cur.execute("""
+            UPDATE vehicle_arrivals
+            SET operator = %s
+            WHERE operator = %s
+        """, (name, code))
+        
+        if cur.rowcount > 0:
+            print(f"   {code:10} → {name:20} ({cur.rowcount} records)")
+            total_fixed += cur.rowcount
+    
     conn.commit()
     print(f"   ✓ Fixed {total_fixed} records in vehicle_arrivals")
     
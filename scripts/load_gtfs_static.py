@@ -1,7 +1,11 @@
 import csv
+import os
 import psycopg2
 from psycopg2.extras import execute_values
 import sys
+from dotenv import load_dotenv
+
+load_dotenv()
 
 def load_routes(cursor):
     routes = []
@@ -84,11 +88,11 @@ def load_stop_times(cursor, batch_size=10000):
 
 try:
     conn = psycopg2.connect(
-        host="localhost",
-        port=5432,
-        database="pt_analytics_db",
-        user="ptqueryer",
-        password="pt_pass"
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", 5432),
+        database=os.getenv("DB_NAME", "pt_analytics_db"),
+        user=os.getenv("DB_USER", "ptqueryer"),
+        password=os.getenv("DB_PASSWORD")
     )
     cursor = conn.cursor()
     
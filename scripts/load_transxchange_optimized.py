@@ -5,13 +5,27 @@ Optimized with batch processing for maximum speed
 
 import psycopg2
 import psycopg2.extras
+import csv
+import io
 import json
 import os
+import queue
 import sys
+import threading
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api.database import bump_data_version
+
 load_dotenv()
 
+def copy_rows(cur, table, columns, rows):
+    """Bulk load rows with COPY FROM STDIN (CSV) - no per-row SQL parsing/binding"""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
 # Connect to database
 conn = psycopg2.connect(
     host=os.getenv("DB_HOST"),
@@ -69,6 +83,7 @@ psycopg2.extras.execute_values(
     stop_values,
     page_size=1000
 )
+bump_data_version(cur)  # Stop names/coordinates are part of the cached dwell-time responses
 conn.commit()
 print(f"   ✓ Inserted {len(stop_values):,} stops")
 
@@ -107,53 +122,83 @@ print(f"   ✓ Inserted {len(pattern_values):,} route patterns")
 # Step 3: Load stop sequences using execute_values in chunks
 print("\n4. Inserting stop sequences (batch processing)...")
 
-# Collect all sequences first (only for stops that exist)
+# Only stops that exist (have coordinates) can be referenced
 valid_stops = set(naptan_id for naptan_id, stop in stops.items() 
                   if stop.get('lat') is not None and stop.get('lon') is not None)
 
-all_sequences = []
-skipped_sequences = 0
+# COPY into a staging table in chunks, then one INSERT ... ON CONFLICT into the real table
+cur.execute("""
+    CREATE TEMP TABLE tmp_pattern_stops (
+        service_code TEXT,
+        naptan_id TEXT,
+        stop_sequence INTEGER
+    ) ON COMMIT DROP
+""")
 
-for route in routes:
-    service_code = route['service_code']
-    for idx, naptan_id in enumerate(route['stops']):
-        # stops are just naptan_id strings
-        if naptan_id in valid_stops:
-            all_sequences.append((service_code, naptan_id, idx + 1))
-        else:
-            skipped_sequences += 1
+chunk_size = 100000
+chunk_queue = queue.Queue(maxsize=8)  # Bounded: building chunks can't run far ahead of the DB
+writer_errors = []
+total_processed = 0
 
-if skipped_sequences > 0:
-    print(f"   ⚠ Skipping {skipped_sequences} sequences for stops without coordinates")
+def copy_writer():
+    """Drain chunks from the queue into the staging table while the main thread builds more"""
+    global total_processed
+    while True:
+        chunk = chunk_queue.get()
+        if chunk is None:
+            return
+        if writer_errors:
+            continue  # Keep draining so the producer never blocks on a dead writer
+        try:
+            copy_rows(cur, 'tmp_pattern_stops', ['service_code', 'naptan_id', 'stop_sequence'], chunk)
+        except Exception as e:
+            writer_errors.append(e)
+            continue
+        
+        total_processed += len(chunk)
+        print(f"   Progress: {total_processed:,} sequences...", end='\r')
+        sys.stdout.flush()
+
+writer = threading.Thread(target=copy_writer, name="copy-writer")
+writer.start()
+
+chunk = []
+skipped_sequences = 0
 
-print(f"   Total sequences to insert: {len(all_sequences):,}")
+try:
+    for route in routes:
+        service_code = route['service_code']
+        for idx, naptan_id in enumerate(route['stops']):
+            # stops are just naptan_id strings
+            if naptan_id in valid_stops:
+                chunk.append((service_code, naptan_id, idx + 1))
+                if len(chunk) >= chunk_size:
+                    chunk_queue.put(chunk)
+                    chunk = []
+            else:
+                skipped_sequences += 1
+    
+    if chunk:
+        chunk_queue.put(chunk)
+finally:
+    chunk_queue.put(None)
+    writer.join()
 
-# Insert in chunks of 10000
-chunk_size = 10000
-total_processed = 0
+if writer_errors:
+    raise writer_errors[0]
 
-for i in range(0, len(all_sequences), chunk_size):
-    chunk = all_sequences[i:i+chunk_size]
-    
-    psycopg2.extras.execute_values(
-        cur,
-        """
-        INSERT INTO txc_pattern_stops (service_code, naptan_id, stop_sequence)
-        VALUES %s
-        ON CONFLICT (service_code, stop_sequence) DO NOTHING
-        """,
-        chunk,
-        page_size=1000
-    )
-    
-    total_processed += len(chunk)
-    print(f"   Progress: {total_processed:,}/{len(all_sequences):,} sequences...", end='\r')
-    sys.stdout.flush()
-    
-    # Commit every chunk
-    conn.commit()
+if skipped_sequences > 0:
+    print(f"\n   ⚠ Skipped {skipped_sequences} sequences for stops without coordinates")
+
+cur.execute("""
+    INSERT INTO txc_pattern_stops (service_code, naptan_id, stop_sequence)
+    SELECT service_code, naptan_id, stop_sequence
+    FROM tmp_pattern_stops
+    ON CONFLICT (service_code, stop_sequence) DO NOTHING
+""")
+conn.commit()
 
-print(f"\n   ✓ Inserted {len(all_sequences):,} stop sequences")
+print(f"\n   ✓ Inserted {total_processed:,} stop sequences")
 
 # Verify data
 print("\n" + "="*80)
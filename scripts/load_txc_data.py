@@ -7,8 +7,12 @@ import json
 import psycopg2
 import psycopg2.extras
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api.database import bump_data_version
+
 load_dotenv()
 
 conn = psycopg2.connect(
@@ -39,6 +43,7 @@ print("="*80)
 # Step 1: Clear existing data
 print("\n1. Clearing existing data...")
 cur.execute("TRUNCATE txc_pattern_stops, txc_route_patterns, txc_stops CASCADE")
+bump_data_version(cur)  # Stop names/coordinates are part of the cached dwell-time responses
 conn.commit()
 print("   ✓ Tables cleared")
 
@@ -61,6 +66,7 @@ psycopg2.extras.execute_values(
     stop_values,
     page_size=1000
 )
+bump_data_version(cur)
 conn.commit()
 print(f"   ✓ Loaded {len(stop_values):,} stops")
 if skipped > 0:
@@ -194,6 +200,23 @@ print(f"   ✓ Loaded {len(sequence_values):,} stop sequences")
 if skipped_stops:
     print(f"   ⚠ Skipped {len(skipped_stops)} sequences for stops without coordinates")
 
+# Step 5: Refresh the pre-joined stop -> routes view (created by scripts/setup_db.py)
+print("\n5. Refreshing stop-routes lookup...")
+cur.execute("SELECT ispopulated FROM pg_matviews WHERE matviewname = 'mv_stop_routes'")
+view = cur.fetchone()
+if view is None:
+    raise SystemExit("   ✗ mv_stop_routes is missing - run scripts/setup_db.py first")
+
+# CONCURRENTLY keeps /stops/{id} readable during the refresh, but needs an already-populated view
+if view[0]:
+    cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_stop_routes")
+else:
+    cur.execute("REFRESH MATERIALIZED VIEW mv_stop_routes")
+conn.commit()
+
+cur.execute("SELECT COUNT(*) FROM mv_stop_routes")
+print(f"   ✓ Refreshed mv_stop_routes ({cur.fetchone()[0]:,} stop-route rows)")
+
 # Verification
 print("\n" + "="*80)
 print("VERIFICATION")
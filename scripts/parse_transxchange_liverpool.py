@@ -6,18 +6,22 @@ OPTIMIZED: Multiprocessing for 9600+ files
 
 import os
 import xml.etree.ElementTree as ET
-import json
+import orjson
 from pathlib import Path
 from collections import defaultdict
 from multiprocessing import Pool, cpu_count
 
 # TransXChange namespace
 NS = {'txc': 'http://www.transxchange.org.uk/'}
+TXC = '{http://www.transxchange.org.uk/}'
 
-def parse_operator_info(root):
+# Bulky sections we never read - dropped as soon as they finish parsing
+DISCARD_TAGS = {TXC + 'RouteSections', TXC + 'Routes', TXC + 'VehicleJourney', TXC + 'VehicleJourneys'}
+
+def parse_operator_info(root, path='.//txc:Operators/txc:Operator'):
     """Extract operator information from XML"""
     operators = {}
-    for operator in root.findall('.//txc:Operators/txc:Operator', NS):
+    for operator in root.findall(path, NS):
         op_id = operator.get('id')
         noc = operator.find('txc:NationalOperatorCode', NS)
         short_name = operator.find('txc:OperatorShortName', NS)
@@ -45,6 +49,56 @@ def parse_file_wrapper(xml_path):
     routes = parse_transxchange_file(xml_path, local_stops)
     return (local_stops, routes)
 
+def add_annotated_stops(stop_points, global_stops):
+    """Add Liverpool stops (with lat/lon) from a StopPoints element to global_stops"""
+    # Build stop info with lat/lon from AnnotatedStopPointRef
+    for annotated_stop in stop_points.findall('txc:AnnotatedStopPointRef', NS):
+        ref = annotated_stop.find('txc:StopPointRef', NS)
+        if ref is None:
+            continue
+        
+        naptan = ref.text
+        if not is_liverpool_stop(naptan):
+            continue
+        
+        # Only add if not already in global stops
+        if naptan not in global_stops:
+            name = annotated_stop.find('txc:CommonName', NS)
+            location = annotated_stop.find('txc:Location', NS)
+            
+            stop_data = {
+                'name': name.text if name is not None else naptan,
+                'lat': None,
+                'lon': None
+            }
+            
+            if location is not None:
+                lat_elem = location.find('txc:Latitude', NS)
+                lon_elem = location.find('txc:Longitude', NS)
+                
+                if lat_elem is not None:
+                    stop_data['lat'] = float(lat_elem.text)
+                if lon_elem is not None:
+                    stop_data['lon'] = float(lon_elem.text)
+            
+            global_stops[naptan] = stop_data
+
+def parse_section_stops(jps):
+    """Liverpool stops of a JourneyPatternSection, ordered by SequenceNumber"""
+    stops_dict = {}
+    
+    for link in jps.findall('.//txc:JourneyPatternTimingLink', NS):
+        for elem in [link.find('txc:From', NS), link.find('txc:To', NS)]:
+            if elem is not None:
+                seq = elem.get('SequenceNumber')
+                stop_ref = elem.find('txc:StopPointRef', NS)
+                if seq and stop_ref is not None:
+                    naptan = stop_ref.text
+                    if is_liverpool_stop(naptan):
+                        stops_dict[int(seq)] = naptan
+    
+    return [stops_dict[seq] for seq in sorted(stops_dict.keys())]
+
 def parse_transxchange_file(xml_path, global_stops):
     """
     Extract operator, routes, and stops from TransXChange XML.
@@ -52,48 +106,34 @@ def parse_transxchange_file(xml_path, global_stops):
     Returns: dict with operator and route info (referencing stop IDs only)
     """
     try:
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        
-        # Get operator info
-        operators = parse_operator_info(root)
+        operators = {}
+        sections = {}  # JourneyPatternSection id -> Liverpool stops in sequence order
+        services = []
         
-        # Build stop info with lat/lon from AnnotatedStopPointRef
-        for annotated_stop in root.findall('.//txc:StopPoints/txc:AnnotatedStopPointRef', NS):
-            ref = annotated_stop.find('txc:StopPointRef', NS)
-            if ref is None:
-                continue
+        # Stream the file: only Services are kept whole, everything else is reduced and cleared
+        for event, elem in ET.iterparse(xml_path, events=('end',)):
+            tag = elem.tag
             
-            naptan = ref.text
-            if not is_liverpool_stop(naptan):
-                continue
-            
-            # Only add if not already in global stops
-            if naptan not in global_stops:
-                name = annotated_stop.find('txc:CommonName', NS)
-                location = annotated_stop.find('txc:Location', NS)
-                
-                stop_data = {
-                    'name': name.text if name is not None else naptan,
-                    'lat': None,
-                    'lon': None
-                }
-                
-                if location is not None:
-                    lat_elem = location.find('txc:Latitude', NS)
-                    lon_elem = location.find('txc:Longitude', NS)
-                    
-                    if lat_elem is not None:
-                        stop_data['lat'] = float(lat_elem.text)
-                    if lon_elem is not None:
-                        stop_data['lon'] = float(lon_elem.text)
-                
-                global_stops[naptan] = stop_data
+            if tag == TXC + 'JourneyPatternSection':
+                section_id = elem.get('id')
+                if section_id not in sections:
+                    sections[section_id] = parse_section_stops(elem)
+                elem.clear()
+            elif tag == TXC + 'StopPoints':
+                add_annotated_stops(elem, global_stops)
+                elem.clear()
+            elif tag == TXC + 'Operators':
+                operators.update(parse_operator_info(elem, 'txc:Operator'))
+                elem.clear()
+            elif tag == TXC + 'Service':
+                services.append(elem)
+            elif tag in DISCARD_TAGS:
+                elem.clear()
         
         routes_data = []
         
         # Get all services
-        for service in root.findall('.//txc:Services/txc:Service', NS):
+        for service in services:
             service_code = service.find('txc:ServiceCode', NS)
             if service_code is None:
                 continue
@@ -135,24 +175,9 @@ def parse_transxchange_file(xml_path, global_stops):
                     
                     for jps_ref in jps_refs:
                         ref = jps_ref.text
-                        if ref:
-                            jps = root.find(f'.//txc:JourneyPatternSections/txc:JourneyPatternSection[@id="{ref}"]', NS)
-                            if jps is not None:
-                                stops_dict = {}
-                                
-                                for link in jps.findall('.//txc:JourneyPatternTimingLink', NS):
-                                    for elem in [link.find('txc:From', NS), link.find('txc:To', NS)]:
-                                        if elem is not None:
-                                            seq = elem.get('SequenceNumber')
-                                            stop_ref = elem.find('txc:StopPointRef', NS)
-                                            if seq and stop_ref is not None:
-                                                naptan = stop_ref.text
-                                                if is_liverpool_stop(naptan):
-                                                    stops_dict[int(seq)] = naptan
-                                
-                                # Add stops in sequence
-                                for seq in sorted(stops_dict.keys()):
-                                    stop_sequence.append(stops_dict[seq])
+                        if ref and ref in sections:
+                            # Add stops in sequence
+                            stop_sequence.extend(sections[ref])
                     
                     # Only include routes that have Liverpool stops
                     if stop_sequence:
@@ -206,37 +231,35 @@ def process_all_files(input_dir, output_json):
     # Step 2: Process files in parallel
     print(f"\nProcessing with {cpu_count()} CPU cores...")
     
-    with Pool(cpu_count()) as pool:
-        # Use shared dict for stops (not ideal, but works)
-        results = pool.map(parse_file_wrapper, xml_files)
-    
-    # Step 3: Merge results
-    print("\nMerging results...")
+    # Step 3: Merge results as workers finish them (imap keeps file order, so output is deterministic)
+    print("Merging results as files complete...")
     global_stops = {}
     operators_data = defaultdict(lambda: {'routes': []})
+    chunksize = max(1, min(64, total_files // (cpu_count() * 4)))
     
-    for stops_dict, routes_list in results:
-        # Merge stops
-        global_stops.update(stops_dict)
-        
-        # Merge routes
-        for route in routes_list:
-            op_name = route['operator']['short_name']
-            op_noc = route['operator']['noc']
-            
-            if not operators_data[op_name].get('noc'):
-                operators_data[op_name]['noc'] = op_noc
-                operators_data[op_name]['full_name'] = route['operator']['full_name']
+    with Pool(cpu_count()) as pool:
+        for stops_dict, routes_list in pool.imap(parse_file_wrapper, xml_files, chunksize=chunksize):
+            # Merge stops
+            global_stops.update(stops_dict)
             
-            operators_data[op_name]['routes'].append({
-                'route_name': route['route_name'],
-                'service_code': route['service_code'],
-                'direction': route['direction'],
-                'description': route['description'],
-                'origin': route['origin'],
-                'destination': route['destination'],
-                'stops': route['stops']
-            })
+            # Merge routes
+            for route in routes_list:
+                op_name = route['operator']['short_name']
+                op_noc = route['operator']['noc']
+                
+                if not operators_data[op_name].get('noc'):
+                    operators_data[op_name]['noc'] = op_noc
+                    operators_data[op_name]['full_name'] = route['operator']['full_name']
+                
+                operators_data[op_name]['routes'].append({
+                    'route_name': route['route_name'],
+                    'service_code': route['service_code'],
+                    'direction': route['direction'],
+                    'description': route['description'],
+                    'origin': route['origin'],
+                    'destination': route['destination'],
+                    'stops': route['stops']
+                })
     
     # Build final structure
     output = {
@@ -254,9 +277,11 @@ def process_all_files(input_dir, output_json):
         }
         total_routes += len(op_data['routes'])
     
-    # Write JSON
-    with open(output_json, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    # Write JSON to a temp file and swap it in, so readers never see a half-written file
+    tmp_json = f"{output_json}.tmp"
+    with open(tmp_json, 'wb') as f:
+        f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_json, output_json)
     
     file_size_mb = os.path.getsize(output_json) / (1024 * 1024)
     
@@ -0,0 +1,104 @@
+"""
+Database index and view setup
+Creates the views and indexes that serve the API's hot read paths. Safe to re-run.
+"""
+
+import psycopg2
+import os
+import sys
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api.database import DATA_VERSION_DDL
+
+load_dotenv()
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'pt_analytics'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD')
+}
+
+MATERIALIZED_VIEWS = [
+    # Pre-joined stop -> routes for /stops/{id}; scripts/load_txc_data.py refreshes it after each load
+    ("mv_stop_routes", """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS mv_stop_routes AS
+        SELECT DISTINCT
+            ps.naptan_id,
+            rp.route_name,
+            rp.operator_name,
+            rp.direction
+        FROM txc_pattern_stops ps
+        JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
+    """),
+]
+
+INDEXES = [
+    # vehicle_positions is append-only by time, so BRIN prunes time ranges at a fraction of btree size
+    ("idx_vp_ts_brin", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vp_ts_brin
+        ON vehicle_positions USING brin(timestamp) WITH (pages_per_range = 32)
+    """),
+    # Serves the /vehicles/live DISTINCT ON (vehicle_id) ... ORDER BY timestamp DESC as an index-only scan
+    ("idx_vp_vehicle_ts", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vp_vehicle_ts
+        ON vehicle_positions(vehicle_id, timestamp DESC)
+        INCLUDE (latitude, longitude, bearing, route_name, direction, operator, origin, destination)
+        WHERE latitude BETWEEN 53.35 AND 53.48
+          AND longitude BETWEEN -3.05 AND -2.85
+    """),
+    # Lets nearest-stop lookups use KNN (ORDER BY geog <-> point) instead of sorting every candidate
+    ("idx_txc_stops_geog", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_txc_stops_geog
+        ON txc_stops USING gist(geog)
+    """),
+    # Route/direction filter of the vehicle matcher join
+    ("idx_route_patterns_route_dir", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_route_patterns_route_dir
+        ON txc_route_patterns(route_name, direction) INCLUDE (pattern_id)
+    """),
+    # Stop -> pattern side of the mv_stop_routes join
+    ("idx_pattern_stops_naptan", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pattern_stops_naptan
+        ON txc_pattern_stops(naptan_id) INCLUDE (pattern_id)
+    """),
+    # REFRESH ... CONCURRENTLY needs a unique index over every row; its naptan_id prefix serves the stop lookup
+    ("idx_mv_stop_routes_unique", """
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_mv_stop_routes_unique
+        ON mv_stop_routes(naptan_id, route_name, operator_name, direction)
+    """),
+]
+
+ANALYZE_TABLES = ["vehicle_positions", "txc_stops", "txc_route_patterns", "mv_stop_routes"]
+
+def setup_indexes():
+    """Create API views and matcher indexes without blocking the poller's inserts"""
+    conn = psycopg2.connect(**DB_CONFIG)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    cur = conn.cursor()
+    
+    try:
+        # Read by the dwell-time ETags, so it must exist before the first aggregation run
+        print("Creating data_version...", flush=True)
+        cur.execute(DATA_VERSION_DDL)
+        
+        for name, ddl in MATERIALIZED_VIEWS:
+            print(f"Creating {name}...", flush=True)
+            cur.execute(ddl)
+        
+        for name, ddl in INDEXES:
+            print(f"Creating {name}...", flush=True)
+            cur.execute(ddl)
+        
+        for table in ANALYZE_TABLES:
+            cur.execute(f"ANALYZE {table}")
+        print("✓ Views and indexes ready")
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == "__main__":
+    setup_indexes()
@@ -1,17 +1,91 @@
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from contextlib import contextmanager
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_db_connection():
-    """Get database connection with RealDict cursor"""
-    return psycopg2.connect(
+POOL_MIN_CONN = 1
+POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX', 10))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises as soon as it runs dry; this makes callers queue for a slot instead
+_pool_slots = threading.BoundedSemaphore(POOL_MAX_CONN)
+
+def _connect_kwargs():
+    return dict(
         host=os.getenv('DB_HOST'),
         port=os.getenv('DB_PORT'),
         database=os.getenv('DB_NAME'),
         user=os.getenv('DB_USER'),
         password=os.getenv('DB_PASSWORD'),
         cursor_factory=RealDictCursor
-    )
\ No newline at end of file
+    )
+
+def get_db_connection():
+    """Get database connection with RealDict cursor"""
+    return psycopg2.connect(**_connect_kwargs())
+
+def _get_pool():
+    """Create the shared connection pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(POOL_MIN_CONN, POOL_MAX_CONN, **_connect_kwargs())
+    return _pool
+
+@contextmanager
+def pooled_connection():
+    """Borrow a long-lived autocommit connection (keeps prepared statements between requests)"""
+    pool = _get_pool()
+    if not _pool_slots.acquire(timeout=POOL_TIMEOUT):
+        raise PoolError(f"no database connection free after {POOL_TIMEOUT:g}s")
+    try:
+        conn = pool.getconn()
+        broken = False
+        try:
+            conn.autocommit = True
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            pool.putconn(conn, close=broken or conn.closed != 0)
+    finally:
+        _pool_slots.release()
+
+# Single-row counter behind the API's ETags; bumped by every job that rewrites the data they cover
+DATA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL
+    )
+"""
+
+def bump_data_version(cur):
+    """Advance data_version; call inside the writing transaction so it commits with the data"""
+    cur.execute(DATA_VERSION_DDL)
+    cur.execute("""
+        INSERT INTO data_version (id, version) VALUES (TRUE, 1)
+        ON CONFLICT (id) DO UPDATE SET version = data_version.version + 1
+    """)
+
+def execute_prepared(cur, name, sql, params):
+    """
+    EXECUTE a named prepared statement, preparing it on this connection the first time.
+    sql uses $1, $2... placeholders; name must be unique per statement text.
+    """
+    placeholders = ", ".join(["%s"] * len(params))
+    execute_sql = f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"
+    try:
+        cur.execute(execute_sql, params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        cur.execute(execute_sql, params)
@@ -1,7 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from src.api import transxchange_loader
 from src.api.routes import stops, vehicles, routes, test_txc, dwell_time
+import asyncio
+
+async def load_txc_indexes(app: FastAPI):
+    """Build TransXChange lookup indexes in a worker thread so startup isn't blocked"""
+    try:
+        await asyncio.to_thread(transxchange_loader.ensure_data_loaded)
+    except FileNotFoundError:
+        print("WARNING: TransXChange data not found - TXC lookups unavailable", flush=True)
+        return
+    except Exception as e:
+        # Logged now; the exception stays on the task so /ready can report it
+        print(f"ERROR: TransXChange load failed - {e!r}", flush=True)
+        raise
+    
+    # Routes read the indexes from transxchange_loader's module globals; only the outcome lives here
+    app.state.txc_loaded = True
 
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
@@ -13,11 +31,19 @@ async def lifespan(app: FastAPI):
     print("PASSSENGER ACTIVITY ANALYTICS API STARTED", flush=True)
     print("Dwell Time Analysis API - Passenger Activity", flush=True)
     print("="*80, flush=True)
+    app.state.txc_loaded = False
+    app.state.txc_task = asyncio.create_task(load_txc_indexes(app))
     yield
     # Shutdown
     print("Shutting down...", flush=True)
+    app.state.txc_task.cancel()
 
-app = FastAPI(title="Passenger Activity Analytics API", version="1.0.0", lifespan=lifespan)
+app = FastAPI(
+    title="Passenger Activity Analytics API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # CORS for frontend
 app.add_middleware(
@@ -49,4 +75,16 @@ def root():
         "message": "Passenger Activity Analytics API - Dwell Time Analysis",
         "version": "1.0.0",
         "features": ["demand_proxy", "temporal_patterns", "hotspot_detection"]
-    }
\ No newline at end of file
+    }
+
+@app.get("/ready")
+def ready(request: Request):
+    """Readiness probe: 503 until the startup TXC load has finished, or if it failed"""
+    task = request.app.state.txc_task
+    if not task.done():
+        return ORJSONResponse(status_code=503, content={"status": "loading"})
+    if task.cancelled():
+        return ORJSONResponse(status_code=503, content={"status": "failed", "error": "TXC load cancelled"})
+    if task.exception() is not None:
+        return ORJSONResponse(status_code=503, content={"status": "failed", "error": repr(task.exception())})
+    return {"status": "ready", "txc_loaded": request.app.state.txc_loaded}
\ No newline at end of file
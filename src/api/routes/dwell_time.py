@@ -2,9 +2,14 @@
 Dwell Time Analysis API Endpoints
 Provides demand proxy insights based on dwell time patterns
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from src.api.database import get_db_connection
+from decimal import Decimal
+from functools import lru_cache
 from typing import Optional
+import hashlib
+import orjson
 
 router = APIRouter(prefix="/dwell-time", tags=["dwell-time"])
 
@@ -16,12 +21,150 @@ OPERATOR_NAME_MAP = {
     'First Bus': 'First Bus',
 }
 
+STREAM_BATCH_SIZE = 1000  # Rows fetched per round trip when streaming large results
+
+def _json_default(obj):
+    """orjson fallback for NUMERIC columns"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def _dwell_etag(cur, *key) -> str:
+    """ETag for aggregate endpoints: changes whenever the aggregation job or a TXC load bumps data_version"""
+    cur.execute("SELECT version FROM data_version")
+    row = cur.fetchone()
+    version = row['version'] if row else None
+    digest = hashlib.blake2b(f"{version}|{key}".encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check that accepts a tag list and weak W/ tags (gzip proxies weaken ours)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def _cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "public, max-age=30"}
+
+@lru_cache(maxsize=None)
+def _route_stops_query(direction: bool, operator: bool, day_of_week: bool, hour_of_day: bool) -> str:
+    """Build the route stops query for a filter combination (cached so the SQL text is stable)"""
+    query = """
+        SELECT 
+            dta.naptan_id,
+            ts.stop_name,
+            ts.latitude,
+            ts.longitude,
+            dta.direction,
+            dta.operator,
+            dta.day_of_week,
+            dta.hour_of_day,
+            ROUND(dta.avg_dwell_seconds::numeric, 1) as avg_dwell_seconds,
+            ROUND(dta.stddev_dwell_seconds::numeric, 1) as stddev_dwell_seconds,
+            dta.sample_count
+        FROM dwell_time_analysis dta
+        JOIN txc_stops ts ON dta.naptan_id = ts.naptan_id
+        WHERE dta.route_name = %s
+    """
+    
+    if direction:
+        query += " AND dta.direction = %s"
+    if operator:
+        query += " AND dta.operator = %s"
+    if day_of_week:
+        query += " AND dta.day_of_week = %s"
+    if hour_of_day:
+        query += " AND dta.hour_of_day = %s"
+    
+    return query + " ORDER BY dta.avg_dwell_seconds DESC"
+
+@lru_cache(maxsize=None)
+def _stop_pattern_query(route_name: bool) -> str:
+    """Build the stop pattern query with or without a route filter (cached)"""
+    query = """
+        SELECT 
+            route_name,
+            direction,
+            operator,
+            day_of_week,
+            hour_of_day,
+            ROUND(avg_dwell_seconds::numeric, 1) as avg_dwell_seconds,
+            ROUND(stddev_dwell_seconds::numeric, 1) as stddev_dwell_seconds,
+            sample_count
+        FROM dwell_time_analysis
+        WHERE naptan_id = %s
+    """
+    
+    if route_name:
+        query += " AND route_name = %s"
+    
+    return query + " ORDER BY route_name, day_of_week, hour_of_day"
+
+@lru_cache(maxsize=None)
+def _heatmap_query(direction: bool, operator: bool) -> str:
+    """Build the stops × hours heatmap query for a filter combination (cached)"""
+    stop_filters = ""
+    dwell_filters = ""
+    
+    if direction:
+        stop_filters += " AND rp.direction = %s"
+        dwell_filters += " AND direction = %s"
+    
+    if operator:
+        stop_filters += " AND rp.operator_name = %s"
+        dwell_filters += " AND operator = %s"
+    
+    # One row per stop in sequence order, with its 24 hourly averages (NULL = no data)
+    return f"""
+        WITH route_stops AS (
+            SELECT
+                ps.naptan_id,
+                ts.stop_name,
+                MIN(ps.stop_sequence) as sequence
+            FROM txc_pattern_stops ps
+            JOIN txc_stops ts ON ps.naptan_id = ts.naptan_id
+            JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
+            WHERE rp.route_name = %s{stop_filters}
+            GROUP BY ps.naptan_id, ts.stop_name
+        ),
+        hourly AS (
+            SELECT
+                naptan_id,
+                hour_of_day,
+                ROUND(AVG(avg_dwell_seconds)::numeric, 1)::float8 as avg_dwell
+            FROM dwell_time_analysis
+            WHERE route_name = %s{dwell_filters}
+            GROUP BY naptan_id, hour_of_day
+        )
+        SELECT
+            rs.stop_name,
+            ARRAY(
+                SELECT h.avg_dwell
+                FROM generate_series(0, 23) as hr(hour_of_day)
+                LEFT JOIN hourly h
+                    ON h.naptan_id = rs.naptan_id AND h.hour_of_day = hr.hour_of_day
+                ORDER BY hr.hour_of_day
+            ) as hourly_dwell
+        FROM route_stops rs
+        ORDER BY rs.sequence
+    """
+
 @router.get("/routes")
-def get_routes_with_dwell_data():
+def get_routes_with_dwell_data(request: Request, response: Response):
     """Get all routes with dwell time data available"""
     conn = get_db_connection()
     cur = conn.cursor()
     
+    etag = _dwell_etag(cur)
+    if _etag_matches(request, etag):
+        cur.close()
+        conn.close()
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    
     cur.execute("""
         SELECT 
             route_name,
@@ -48,65 +191,59 @@ def get_route_stops_dwell(
     day_of_week: Optional[int] = Query(None, ge=0, le=6),
     hour_of_day: Optional[int] = Query(None, ge=0, le=23)
 ):
-    """Get dwell time analysis for stops on a route"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    query = """
-        SELECT 
-            dta.naptan_id,
-            ts.stop_name,
-            ts.latitude,
-            ts.longitude,
-            dta.direction,
-            dta.operator,
-            dta.day_of_week,
-            dta.hour_of_day,
-            ROUND(dta.avg_dwell_seconds::numeric, 1) as avg_dwell_seconds,
-            ROUND(dta.stddev_dwell_seconds::numeric, 1) as stddev_dwell_seconds,
-            dta.sample_count
-        FROM dwell_time_analysis dta
-        JOIN txc_stops ts ON dta.naptan_id = ts.naptan_id
-        WHERE dta.route_name = %s
-    """
-    
+    """Get dwell time analysis for stops on a route (streamed, can be thousands of rows)"""
     params = [route_name]
     
     if direction:
-        query += " AND dta.direction = %s"
         params.append(direction)
     
     if operator:
-        query += " AND dta.operator = %s"
         params.append(operator)
     
     if day_of_week is not None:
-        query += " AND dta.day_of_week = %s"
         params.append(day_of_week)
     
     if hour_of_day is not None:
-        query += " AND dta.hour_of_day = %s"
         params.append(hour_of_day)
     
-    query += " ORDER BY dta.avg_dwell_seconds DESC"
+    query = _route_stops_query(
+        bool(direction), bool(operator), day_of_week is not None, hour_of_day is not None
+    )
     
-    cur.execute(query, params)
-    stops = cur.fetchall()
-    
-    cur.close()
-    conn.close()
-    
-    return {
+    header = orjson.dumps({
         "route_name": route_name,
         "filters": {
             "direction": direction,
             "operator": operator,
             "day_of_week": day_of_week,
             "hour_of_day": hour_of_day
-        },
-        "stops": stops,
-        "count": len(stops)
-    }
+        }
+    })
+    
+    def generate():
+        # Connect only once streaming starts: a client gone before the first chunk never runs
+        # this body, so nothing opened here could be left without its finally
+        conn = get_db_connection()
+        try:
+            # Server-side cursor: rows are pulled in batches instead of all at once
+            cur = conn.cursor(name="route_stops_dwell")
+            cur.itersize = STREAM_BATCH_SIZE
+            cur.execute(query, params)
+            
+            yield header[:-1] + b',"stops":['
+            count = 0
+            while True:
+                rows = cur.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                chunk = b','.join(orjson.dumps(row, default=_json_default) for row in rows)
+                yield (b',' + chunk) if count else chunk
+                count += len(rows)
+            yield b'],"count":' + str(count).encode() + b'}'
+        finally:
+            conn.close()
+    
+    return StreamingResponse(generate(), media_type="application/json")
 
 @router.get("/stop/{naptan_id}/pattern")
 def get_stop_dwell_pattern(
@@ -131,27 +268,12 @@ def get_stop_dwell_pattern(
         conn.close()
         raise HTTPException(status_code=404, detail="Stop not found")
     
-    query = """
-        SELECT 
-            route_name,
-            direction,
-            operator,
-            day_of_week,
-            hour_of_day,
-            ROUND(avg_dwell_seconds::numeric, 1) as avg_dwell_seconds,
-            ROUND(stddev_dwell_seconds::numeric, 1) as stddev_dwell_seconds,
-            sample_count
-        FROM dwell_time_analysis
-        WHERE naptan_id = %s
-    """
-    
     params = [naptan_id]
     
     if route_name:
-        query += " AND route_name = %s"
         params.append(route_name)
     
-    query += " ORDER BY route_name, day_of_week, hour_of_day"
+    query = _stop_pattern_query(bool(route_name))
     
     cur.execute(query, params)
     patterns = cur.fetchall()
@@ -167,6 +289,8 @@ def get_stop_dwell_pattern(
 
 @router.get("/hotspots")
 def get_high_demand_stops(
+    request: Request,
+    response: Response,
     min_samples: int = Query(10, ge=1),
     limit: int = Query(20, ge=1, le=100)
 ):
@@ -174,6 +298,13 @@ def get_high_demand_stops(
     conn = get_db_connection()
     cur = conn.cursor()
     
+    etag = _dwell_etag(cur, min_samples, limit)
+    if _etag_matches(request, etag):
+        cur.close()
+        conn.close()
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    
     cur.execute("""
         SELECT 
             dta.naptan_id,
@@ -210,85 +341,38 @@ def get_dwell_time_heatmap(
     operator_txc = operator
     operator_dwell = OPERATOR_NAME_MAP.get(operator, operator) if operator else None
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Get stops on route in sequence order
-    query_stops = """
-        SELECT DISTINCT
-            ps.naptan_id,
-            ts.stop_name,
-            MIN(ps.stop_sequence) as sequence
-        FROM txc_pattern_stops ps
-        JOIN txc_stops ts ON ps.naptan_id = ts.naptan_id
-        JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
-        WHERE rp.route_name = %s
-    """
-    
-    params_stops = [route_name]
+    params = [route_name]
     
     if direction:
-        query_stops += " AND rp.direction = %s"
-        params_stops.append(direction)
+        params.append(direction)
     
     if operator_txc:
-        query_stops += " AND rp.operator_name = %s"
-        params_stops.append(operator_txc)
-    
-    query_stops += " GROUP BY ps.naptan_id, ts.stop_name ORDER BY sequence"
-    
-    cur.execute(query_stops, params_stops)
-    stops = cur.fetchall()
-    
-    if not stops:
-        cur.close()
-        conn.close()
-        raise HTTPException(status_code=404, detail="No stops found for this route")
-    
-    # Get dwell time data for heatmap
-    query_heatmap = """
-        SELECT 
-            naptan_id,
-            hour_of_day,
-            ROUND(AVG(avg_dwell_seconds)::numeric, 1) as avg_dwell
-        FROM dwell_time_analysis
-        WHERE route_name = %s
-    """
+        params.append(operator_txc)
     
-    params_heatmap = [route_name]
+    params.append(route_name)
     
     if direction:
-        query_heatmap += " AND direction = %s"
-        params_heatmap.append(direction)
+        params.append(direction)
     
     if operator_dwell:
-        query_heatmap += " AND operator = %s"
-        params_heatmap.append(operator_dwell)
+        params.append(operator_dwell)
     
-    query_heatmap += " GROUP BY naptan_id, hour_of_day"
+    conn = get_db_connection()
+    cur = conn.cursor()
     
-    cur.execute(query_heatmap, params_heatmap)
-    heatmap_data = cur.fetchall()
+    # Matrix is assembled in SQL: stops × hours in a single round trip
+    cur.execute(_heatmap_query(bool(direction), bool(operator)), params)
+    rows = cur.fetchall()
     
     cur.close()
     conn.close()
     
-    # Build matrix: stops × hours
-    hours = list(range(24))
-    stop_ids = [s['naptan_id'] for s in stops]
-    stop_names = [s['stop_name'] for s in stops]
-    
-    # Initialize matrix with None
-    matrix = [[None for _ in hours] for _ in stop_ids]
+    if not rows:
+        raise HTTPException(status_code=404, detail="No stops found for this route")
     
-    # Fill matrix with actual data
-    for row in heatmap_data:
-        try:
-            stop_idx = stop_ids.index(row['naptan_id'])
-            hour_idx = row['hour_of_day']
-            matrix[stop_idx][hour_idx] = float(row['avg_dwell'])
-        except (ValueError, IndexError):
-            continue
+    hours = list(range(24))
+    stop_names = [row['stop_name'] for row in rows]
+    matrix = [row['hourly_dwell'] for row in rows]
     
     return {
         "route_name": route_name,
@@ -305,22 +389,24 @@ def get_filter_options():
     conn = get_db_connection()
     cur = conn.cursor()
     
-    # Get unique operators
+    # Both option lists in one round trip
     cur.execute("""
-        SELECT DISTINCT operator_name
-        FROM txc_route_patterns
-        ORDER BY operator_name
+        SELECT
+            ARRAY(
+                SELECT DISTINCT operator_name
+                FROM txc_route_patterns
+                ORDER BY operator_name
+            ) as operators,
+            ARRAY(
+                SELECT DISTINCT direction
+                FROM txc_route_patterns
+                WHERE direction IS NOT NULL
+                ORDER BY direction
+            ) as directions
     """)
-    operators = [row['operator_name'] for row in cur.fetchall()]
-    
-    # Get unique directions
-    cur.execute("""
-        SELECT DISTINCT direction
-        FROM txc_route_patterns
-        WHERE direction IS NOT NULL
-        ORDER BY direction
-    """)
-    directions = [row['direction'] for row in cur.fetchall()]
+    row = cur.fetchone()
+    operators = row['operators']
+    directions = row['directions']
     
     cur.close()
     conn.close()
@@ -331,11 +417,18 @@ def get_filter_options():
     }
 
 @router.get("/stats")
-def get_dwell_time_stats():
+def get_dwell_time_stats(request: Request, response: Response):
     """Get overall dwell time statistics"""
     conn = get_db_connection()
     cur = conn.cursor()
     
+    etag = _dwell_etag(cur)
+    if _etag_matches(request, etag):
+        cur.close()
+        conn.close()
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    
     cur.execute("""
         SELECT 
             COUNT(DISTINCT naptan_id) as unique_stops,
@@ -2,7 +2,7 @@
 Stop information endpoints (TXC data only)
 """
 from fastapi import APIRouter, HTTPException, Query
-from src.api.database import get_db_connection
+from src.api.database import get_db_connection, pooled_connection, execute_prepared
 from typing import Optional
 
 router = APIRouter(prefix="/stops", tags=["stops"])
@@ -45,42 +45,41 @@ def get_all_stops(
 @router.get("/{stop_id}")
 def get_stop_details(stop_id: str):
     """Get stop details with routes serving it"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Get stop info
-    cur.execute("""
-        SELECT naptan_id as stop_id, stop_name, latitude, longitude
-        FROM txc_stops
-        WHERE naptan_id = %s
-    """, (stop_id,))
-    
-    stop_info = cur.fetchone()
+    # Stop info and serving routes in a single round trip
+    query = """
+        WITH stop AS (
+            SELECT naptan_id as stop_id, stop_name, latitude, longitude
+            FROM txc_stops
+            WHERE naptan_id = $1
+        ),
+        stop_routes AS (
+            SELECT COALESCE(
+                json_agg(r ORDER BY r.route_name, r.direction),
+                '[]'::json
+            ) as routes
+            FROM (
+                SELECT route_name, operator_name, direction
+                FROM mv_stop_routes
+                WHERE naptan_id = $1
+            ) r
+        )
+        SELECT s.stop_id, s.stop_name, s.latitude, s.longitude, sr.routes
+        FROM stop s, stop_routes sr
+    """
     
-    if not stop_info:
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        execute_prepared(cur, "stop_details", query, (stop_id,))
+        row = cur.fetchone()
         cur.close()
-        conn.close()
-        raise HTTPException(status_code=404, detail="Stop not found")
-    
-    # Get routes serving this stop
-    cur.execute("""
-        SELECT DISTINCT
-            rp.route_name,
-            rp.operator_name,
-            rp.direction
-        FROM txc_pattern_stops ps
-        JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
-        WHERE ps.naptan_id = %s
-        ORDER BY rp.route_name, rp.direction
-    """, (stop_id,))
     
-    routes = cur.fetchall()
+    if not row:
+        raise HTTPException(status_code=404, detail="Stop not found")
     
-    cur.close()
-    conn.close()
+    routes = row.pop('routes')
     
     return {
-        "stop": stop_info,
+        "stop": row,
         "routes": routes,
         "route_count": len(routes)
-    }
\ No newline at end of file
+    }
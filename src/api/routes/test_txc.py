@@ -2,6 +2,7 @@
 Test endpoint to verify TransXChange data loading
 """
 from fastapi import APIRouter
+from itertools import islice
 from src.api.transxchange_loader import (
     get_stop_info,
     get_routes_at_stop,
@@ -16,13 +17,12 @@ router = APIRouter(prefix="/test-txc", tags=["test"])
 def txc_status():
     """Check if TransXChange data is loaded"""
     from src.api import transxchange_loader
-    # Force load if not loaded
-    transxchange_loader.ensure_data_loaded()
+    # Indexes are built at startup (see main.lifespan); empty until that finishes
     return {
         "loaded": len(transxchange_loader.STOPS) > 0,
         "total_stops": len(transxchange_loader.STOPS),
         "total_routes": len(transxchange_loader.ROUTE_STOPS),
-        "sample_routes": list(transxchange_loader.ROUTE_STOPS.keys())[:5]
+        "sample_routes": list(islice(transxchange_loader.ROUTE_STOPS, 5))
     }
 
 @router.get("/stop/{naptan_id}")
@@ -54,7 +54,7 @@ def test_route_stops(route_name: str):
     return {
         "route": route_name,
         "stop_count": len(stops),
-        "stops": list(stops)[:10],  # First 10 for brevity
+        "stops": list(islice(stops, 10)),  # First 10 for brevity
         "has_queen_square_stand_5": has_test_stop
     }
 
@@ -62,10 +62,9 @@ def test_route_stops(route_name: str):
 def debug_route_variants(route_name: str):
     """Debug: Show all variants of a route"""
     from src.api import transxchange_loader
-    transxchange_loader.ensure_data_loaded()
     
     variants = []
-    for op_name, op_data in transxchange_loader.TXC_DATA['operators'].items():
+    for op_name, op_data in transxchange_loader.TXC_DATA.get('operators', {}).items():
         for route in op_data['routes']:
             if route['route_name'] == route_name:
                 variants.append({
@@ -1,15 +1,35 @@
 from fastapi import APIRouter
-from src.api.database import get_db_connection
+from src.api.database import pooled_connection, execute_prepared
 from datetime import datetime, timedelta
+import threading
+import time
 
 router = APIRouter(prefix="/vehicles", tags=["vehicles"])
 
+# Concurrent /live requests share one query result for this long (seconds)
+LIVE_CACHE_TTL = 0.5
+
+_live_lock = threading.Lock()
+_live_cache = {"expires": 0.0, "payload": None}
+
 @router.get("/live")
 def get_live_vehicles():
     """Get current vehicle positions in Liverpool (last 2 minutes)"""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    if time.monotonic() < _live_cache["expires"]:
+        return _live_cache["payload"]
+    
+    # Only one request queries; the rest wait here and pick up its result
+    with _live_lock:
+        if time.monotonic() < _live_cache["expires"]:
+            return _live_cache["payload"]
+        
+        payload = _query_live_vehicles()
+        _live_cache["payload"] = payload
+        _live_cache["expires"] = time.monotonic() + LIVE_CACHE_TTL
     
+    return payload
+
+def _query_live_vehicles():
     cutoff_time = datetime.now() - timedelta(minutes=2)
     
     # Liverpool bounding box (Merseyside region)
@@ -26,16 +46,16 @@ def get_live_vehicles():
             origin,
             destination
         FROM vehicle_positions
-        WHERE timestamp >= %s
+        WHERE timestamp >= $1
             AND latitude BETWEEN 53.35 AND 53.48
             AND longitude BETWEEN -3.05 AND -2.85
         ORDER BY vehicle_id, timestamp DESC
     """
     
-    cur.execute(query, (cutoff_time,))
-    vehicles = cur.fetchall()
-    
-    cur.close()
-    conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        execute_prepared(cur, "live_vehicles", query, (cutoff_time,))
+        vehicles = cur.fetchall()
+        cur.close()
     
     return {"vehicles": vehicles, "count": len(vehicles)}
@@ -3,31 +3,53 @@ TransXChange data loader for API
 Loads JSON at startup and provides lookup functions
 """
 
-import json
+import os
+import pickle
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, FrozenSet, List, Optional
 import math
+import numpy as np
+import orjson
 
 # Global variables (loaded on first use)
 TXC_DATA: Dict = {}
 STOPS: Dict = {}  # naptan_id -> {name, lat, lon}
-ROUTE_STOPS: Dict = {}  # route_name -> set of naptan_ids
-STOP_ROUTES: Dict = {}  # naptan_id -> list of {route_name, service_code, operator, direction}
+ROUTE_STOPS: Dict = {}  # route_name -> frozenset of naptan_ids
+STOP_ROUTES: Dict = {}  # naptan_id -> list of {route_name, service_code, operator, direction} (shared per route pattern)
 _loaded = False  # Flag to track if data is loaded
+_load_lock = threading.Lock()  # API loads in a startup thread while requests may already be arriving
+
+INDEX_CACHE_NAME = "txc_index.pkl"  # Pickled indexes, stored next to the JSON
+CACHE_VERSION = 1  # Bump whenever the shape of TXC_DATA/ROUTE_STOPS/STOP_ROUTES changes
+
+# Coordinate arrays for stops with lat/lon (built at load time for vectorized lookups)
+_NAPTAN_IDS = np.empty(0, dtype=object)  # position -> naptan_id
+_LATS = np.empty(0, dtype=np.float64)
+_LONS = np.empty(0, dtype=np.float64)
+_ROUTE_IDX: Dict = {}  # route_name -> array of positions into the coordinate arrays
+_GRID: Dict = {}  # (lat_cell, lon_cell) -> array of positions of stops in that grid cell
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+EQUIRECT_MAX_RADIUS_M = 1000  # Flat-earth distance is cm-accurate below this; haversine above
+GRID_CELL_DEG = 0.01  # Spatial grid cell size (~1.1km lat x ~0.65km lon in Liverpool)
 
 def ensure_data_loaded():
-    """Lazy load data on first use"""
+    """Lazy load data on first use (the API preloads it at startup)"""
     global _loaded
-    if not _loaded:
-        load_transxchange_data()
-        _loaded = True
+    if _loaded:
+        return
+    with _load_lock:
+        if not _loaded:
+            load_transxchange_data()
+            _loaded = True
 
 def load_transxchange_data(json_path: str = "/data/liverpool_transit_data_enriched.json"):
     """Load TransXChange JSON and build lookup indexes"""
     global TXC_DATA, STOPS, ROUTE_STOPS, STOP_ROUTES
     
-    import os
-    
     # Check if running locally vs Docker - try multiple paths
     paths_to_try = [
         json_path,  # Docker path: /data/...
@@ -49,45 +71,155 @@ def load_transxchange_data(json_path: str = "/data/liverpool_transit_data_enrich
         raise FileNotFoundError(f"TransXChange data not found")
     
     json_path = found_path
-    print(f"Loading TransXChange data from {json_path}...", flush=True)
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        TXC_DATA = json.load(f)
-    
-    # Build stops lookup
-    STOPS = TXC_DATA['stops']
+    cache_path = Path(json_path).with_name(INDEX_CACHE_NAME)
+    # Taken before reading, so a JSON replaced mid-build leaves a cache that no longer matches it
+    source_key = _source_key(json_path)
     
-    # Build route->stops mapping
-    for op_name, op_data in TXC_DATA['operators'].items():
-        for route in op_data['routes']:
-            route_name = route['route_name']
-            service_code = route['service_code']
-            direction = route.get('direction', 'unknown')
-            
-            # Initialize route
-            if route_name not in ROUTE_STOPS:
-                ROUTE_STOPS[route_name] = set()
-            
-            # Add all stops for this route
-            for naptan_id in route['stops']:
-                ROUTE_STOPS[route_name].add(naptan_id)
+    if _load_index_cache(cache_path, source_key):
+        print(f"Loaded TransXChange indexes from {cache_path}", flush=True)
+    else:
+        print(f"Loading TransXChange data from {json_path}...", flush=True)
+        
+        with open(json_path, 'rb') as f:
+            TXC_DATA = orjson.loads(f.read())
+        
+        # Build stops lookup
+        STOPS = TXC_DATA['stops']
+        route_stops = {}
+        stop_routes = {}
+        
+        # Build route->stops mapping
+        # Ids and names are interned so every set/list shares one str object per value
+        for op_name, op_data in TXC_DATA['operators'].items():
+            op_name = sys.intern(op_name)
+            for route in op_data['routes']:
+                route_name = sys.intern(route['route_name'])
+                service_code = sys.intern(route['service_code'])
+                direction = route.get('direction', 'unknown')
                 
-                # Build reverse lookup: stop -> routes
-                if naptan_id not in STOP_ROUTES:
-                    STOP_ROUTES[naptan_id] = []
+                # Initialize route
+                if route_name not in route_stops:
+                    route_stops[route_name] = set()
                 
-                STOP_ROUTES[naptan_id].append({
+                # One entry per route pattern, shared by every stop it serves (treat as read-only)
+                route_entry = {
                     'route_name': route_name,
                     'service_code': service_code,
                     'operator': op_name,
                     'direction': direction,
                     'destination': route.get('description')
-                })
+                }
+                
+                # Add all stops for this route
+                for naptan_id in route['stops']:
+                    naptan_id = sys.intern(naptan_id)
+                    route_stops[route_name].add(naptan_id)
+                    
+                    # Build reverse lookup: stop -> routes
+                    if naptan_id not in stop_routes:
+                        stop_routes[naptan_id] = []
+                    
+                    stop_routes[naptan_id].append(route_entry)
+        
+        ROUTE_STOPS = {route_name: frozenset(naptan_ids) for route_name, naptan_ids in route_stops.items()}
+        STOP_ROUTES = stop_routes
+        
+        _save_index_cache(cache_path, source_key)
+    
+    _build_coordinate_arrays()
     
     print(f"✓ Loaded {len(STOPS):,} stops", flush=True)
     print(f"✓ Loaded {len(ROUTE_STOPS):,} routes", flush=True)
     print(f"✓ Built lookup indexes", flush=True)
 
+def _source_key(json_path: str) -> tuple:
+    """What a cache must have been built from to be reused: index format, JSON size and mtime"""
+    st = os.stat(json_path)
+    return (CACHE_VERSION, st.st_size, st.st_mtime_ns)
+
+def _load_index_cache(cache_path: Path, source_key: tuple) -> bool:
+    """
+    Load indexes from the pickle cache if it was built by this index format from this exact JSON.
+    pickle.load executes whatever a file placed at cache_path tells it to, so the data directory
+    must not be writable by anyone other than the API's own user.
+    """
+    global TXC_DATA, STOPS, ROUTE_STOPS, STOP_ROUTES
+    
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_key, txc_data, route_stops, stop_routes = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return False
+    
+    if cached_key != source_key:
+        return False
+    
+    TXC_DATA, ROUTE_STOPS, STOP_ROUTES = txc_data, route_stops, stop_routes
+    STOPS = TXC_DATA['stops']
+    return True
+
+def _save_index_cache(cache_path: Path, source_key: tuple):
+    """Write indexes and the source key they were built from to the pickle cache atomically (best effort)"""
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((source_key, TXC_DATA, ROUTE_STOPS, STOP_ROUTES), f, protocol=5)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"WARNING: Could not write index cache {cache_path}: {e}", flush=True)
+
+def _build_coordinate_arrays():
+    """Build coordinate arrays and per-route position indexes from STOPS/ROUTE_STOPS"""
+    global _NAPTAN_IDS, _LATS, _LONS, _ROUTE_IDX, _GRID
+    
+    located = [
+        (naptan_id, stop['lat'], stop['lon'])
+        for naptan_id, stop in STOPS.items()
+        if stop['lat'] is not None and stop['lon'] is not None
+    ]
+    
+    _NAPTAN_IDS = np.array([naptan_id for naptan_id, _, _ in located], dtype=object)
+    _LATS = np.array([lat for _, lat, _ in located], dtype=np.float64)
+    _LONS = np.array([lon for _, _, lon in located], dtype=np.float64)
+    
+    position = {naptan_id: i for i, (naptan_id, _, _) in enumerate(located)}
+    _ROUTE_IDX = {
+        route_name: np.array(
+            sorted(position[naptan_id] for naptan_id in naptan_ids if naptan_id in position),
+            dtype=np.intp
+        )
+        for route_name, naptan_ids in ROUTE_STOPS.items()
+    }
+    
+    # Spatial grid so route-less lookups only touch stops in nearby cells
+    lat_cells = np.floor(_LATS / GRID_CELL_DEG).astype(np.int64).tolist()
+    lon_cells = np.floor(_LONS / GRID_CELL_DEG).astype(np.int64).tolist()
+    grid = {}
+    for i, cell in enumerate(zip(lat_cells, lon_cells)):
+        grid.setdefault(cell, []).append(i)
+    _GRID = {cell: np.array(members, dtype=np.intp) for cell, members in grid.items()}
+
+def _grid_candidates(lat: float, lon: float, dlat: float, dlon: float) -> np.ndarray:
+    """Positions of all stops in grid cells overlapping the given lat/lon box"""
+    lat_lo = math.floor((lat - dlat) / GRID_CELL_DEG)
+    lat_hi = math.floor((lat + dlat) / GRID_CELL_DEG)
+    lon_lo = math.floor((lon - dlon) / GRID_CELL_DEG)
+    lon_hi = math.floor((lon + dlon) / GRID_CELL_DEG)
+    
+    cells = [
+        _GRID[cell]
+        for cell in (
+            (lat_cell, lon_cell)
+            for lat_cell in range(lat_lo, lat_hi + 1)
+            for lon_cell in range(lon_lo, lon_hi + 1)
+        )
+        if cell in _GRID
+    ]
+    
+    if not cells:
+        return np.empty(0, dtype=np.intp)
+    return np.concatenate(cells) if len(cells) > 1 else cells[0]
+
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance in meters between two lat/lon points"""
     R = 6371000  # Earth radius in meters
@@ -102,6 +234,26 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     
     return R * c
 
+def _haversine_vec(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distance in meters from one point to arrays of lat/lon points"""
+    R = 6371000  # Earth radius in meters
+    
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(lons - lon)
+    
+    a = np.sin(delta_phi/2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    
+    return R * c
+
+def _equirect_sq_vec(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Squared flat-earth distance in meters² from one point to arrays of lat/lon points"""
+    dx = (lons - lon) * (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+    dy = (lats - lat) * METERS_PER_DEGREE
+    return dx * dx + dy * dy
+
 def find_nearest_stop(lat: float, lon: float, route_name: Optional[str] = None, radius_m: float = 10) -> Optional[tuple]:
     """
     Find nearest stop within radius
@@ -111,27 +263,50 @@ def find_nearest_stop(lat: float, lon: float, route_name: Optional[str] = None,
     """
     ensure_data_loaded()  # Lazy load data
     
-    # Get valid stops for this route
+    # Get valid stop positions for this route (None = all stops)
     if route_name and route_name in ROUTE_STOPS:
-        valid_naptan_ids = ROUTE_STOPS[route_name]
+        positions = _ROUTE_IDX[route_name]
     else:
-        valid_naptan_ids = STOPS.keys()
-    
-    nearest = None
-    min_distance = radius_m
+        positions = None
     
-    for naptan_id in valid_naptan_ids:
-        stop = STOPS.get(naptan_id)
-        if not stop or stop['lat'] is None or stop['lon'] is None:
-            continue
+    if radius_m <= EQUIRECT_MAX_RADIUS_M:
+        dlat = radius_m / METERS_PER_DEGREE
+        dlon = dlat / math.cos(math.radians(lat))
         
-        distance = haversine(lat, lon, stop['lat'], stop['lon'])
+        if positions is None:
+            # No route filter: only consider stops in nearby grid cells
+            positions = _grid_candidates(lat, lon, dlat, dlon)
         
-        if distance <= min_distance:
-            min_distance = distance
-            nearest = (naptan_id, stop, distance)
+        lats = _LATS[positions]
+        lons = _LONS[positions]
+        
+        # Bounding-box prefilter, then flat-earth distance on the survivors
+        in_box = np.flatnonzero((np.abs(lats - lat) <= dlat) & (np.abs(lons - lon) <= dlon))
+        if in_box.size == 0:
+            return None
+        
+        distances_sq = _equirect_sq_vec(lat, lon, lats[in_box], lons[in_box])
+        i = int(np.argmin(distances_sq))
+        distance = math.sqrt(distances_sq[i])
+        i = in_box[i]
+    else:
+        lats = _LATS if positions is None else _LATS[positions]
+        lons = _LONS if positions is None else _LONS[positions]
+        if lats.size == 0:
+            return None
+        
+        distances = _haversine_vec(lat, lon, lats, lons)
+        i = int(np.argmin(distances))
+        distance = float(distances[i])
+    
+    if distance > radius_m:
+        return None
+    
+    if positions is not None:
+        i = positions[i]
     
-    return nearest
+    naptan_id = _NAPTAN_IDS[i]
+    return (naptan_id, STOPS[naptan_id], distance)
 
 def get_routes_at_stop(naptan_id: str) -> List[Dict]:
     """Get all routes serving a stop"""
@@ -148,7 +323,7 @@ def get_stop_info(naptan_id: str) -> Optional[Dict]:
     ensure_data_loaded()  # Lazy load data
     return STOPS.get(naptan_id)
 
-def get_all_stops_for_route(route_name: str) -> Set[str]:
+def get_all_stops_for_route(route_name: str) -> FrozenSet[str]:
     """Get all stop NaPTAN IDs for a route"""
     ensure_data_loaded()  # Lazy load data
-    return ROUTE_STOPS.get(route_name, set())
+    return ROUTE_STOPS.get(route_name, frozenset())
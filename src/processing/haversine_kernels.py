@@ -0,0 +1,47 @@
+"""
+Haversine Kernels
+Numba-compiled nearest-stop search for the in-memory stop matcher
+Optional: HAS_NUMBA is False when numba isn't installed and callers fall back to NumPy
+"""
+
+import math
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+EARTH_RADIUS_M = 6371000.0
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def nearest_within(lat, lon, lats, lons, radius_m):
+        """
+        Nearest point to (lat, lon) strictly closer than radius_m
+        
+        Returns:
+            (index, distance_m), or (-1, radius_m) if nothing is in range
+        """
+        lat1 = math.radians(lat)
+        lon1 = math.radians(lon)
+        cos_lat1 = math.cos(lat1)
+        
+        best_idx = -1
+        best_distance = radius_m
+        
+        for k in range(lats.shape[0]):
+            lat2 = math.radians(lats[k])
+            dlat = lat2 - lat1
+            dlon = math.radians(lons[k]) - lon1
+            
+            a = math.sin(dlat / 2) ** 2 + cos_lat1 * math.cos(lat2) * math.sin(dlon / 2) ** 2
+            distance = EARTH_RADIUS_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+            
+            if distance < best_distance:
+                best_distance = distance
+                best_idx = k
+        
+        return best_idx, best_distance
+else:
+    nearest_within = None
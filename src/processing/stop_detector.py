@@ -4,6 +4,59 @@ Finds stop events from vehicle position history
 A stop event = vehicle at same location for 2+ consecutive timestamps
 """
 
+from operator import itemgetter
+import numpy as np
+
+# Roughly 0.00005 degrees = ~5 meters
+SAME_LOCATION_TOLERANCE_DEG = 0.00005
+MICRODEGREES = 1_000_000  # Coordinates are compared as int32 microdegrees (SIRI-VM reports 6 decimals)
+POLL_INTERVAL_SECONDS = 10
+
+class StopEvents:
+    """
+    Stop events as parallel arrays (one entry per event)
+    Iterating/indexing yields the legacy per-event dicts for existing consumers
+    """
+    
+    def __init__(self, vehicle_ids, route_ids, route_names, directions, operators,
+                 lats, lons, timestamps, poll_counts):
+        self.vehicle_ids = vehicle_ids
+        self.route_ids = route_ids
+        self.route_names = route_names
+        self.directions = directions
+        self.operators = operators
+        self.lats = lats
+        self.lons = lons
+        self.timestamps = timestamps
+        self.poll_counts = poll_counts
+        self.dwell_seconds = poll_counts * POLL_INTERVAL_SECONDS
+    
+    @classmethod
+    def empty(cls):
+        none = np.empty(0, dtype=object)
+        return cls(none, none, none, none, none, np.empty(0), np.empty(0), none, np.empty(0, dtype=np.int64))
+    
+    def __len__(self):
+        return len(self.poll_counts)
+    
+    def __getitem__(self, i):
+        return {
+            'vehicle_id': self.vehicle_ids[i],
+            'route_id': self.route_ids[i],
+            'route_name': self.route_names[i],
+            'direction': self.directions[i],
+            'operator': self.operators[i],
+            'latitude': float(self.lats[i]),
+            'longitude': float(self.lons[i]),
+            'stop_timestamp': self.timestamps[i],  # First timestamp of stop
+            'dwell_time_seconds': int(self.dwell_seconds[i]),
+            'poll_count': int(self.poll_counts[i])
+        }
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 def find_stop_events(vehicle_positions):
     """
     Find stop events from vehicle position history
@@ -13,69 +66,104 @@ def find_stop_events(vehicle_positions):
         vehicle_positions: List of dicts with vehicle_id, timestamp, lat, lon, route_id, route_name, direction, operator
     
     Returns:
-        List of stop events with dwell time, route_name, direction, and operator
+        StopEvents (array-backed; iterates as dicts with dwell time, route_name, direction, and operator)
     """
     if not vehicle_positions:
-        return []
-    
-    stops = []
-    
-    # Group by vehicle
-    by_vehicle = {}
-    for pos in vehicle_positions:
-        vid = pos['vehicle_id']
-        if vid not in by_vehicle:
-            by_vehicle[vid] = []
-        by_vehicle[vid].append(pos)
-    
-    # Process each vehicle's timeline
-    for vehicle_id, positions in by_vehicle.items():
-        # Sort by timestamp
-        positions.sort(key=lambda x: x['timestamp'])
-        
+        return StopEvents.empty()
+    
+    n = len(vehicle_positions)
+    
+    vehicle_ids = np.fromiter(map(itemgetter('vehicle_id'), vehicle_positions), dtype=object, count=n)
+    timestamps = np.fromiter(map(itemgetter('timestamp'), vehicle_positions), dtype=object, count=n)
+    lat = np.fromiter(map(itemgetter('latitude'), vehicle_positions), dtype=np.float64, count=n)
+    lon = np.fromiter(map(itemgetter('longitude'), vehicle_positions), dtype=np.float64, count=n)
+    
+    # run_analysis already fetches ORDER BY vehicle_id, timestamp: each vehicle in one block,
+    # timestamps ascending. Check that on the raw values before paying for any sort
+    new_vehicle = vehicle_ids[1:] != vehicle_ids[:-1]
+    block_vehicles = vehicle_ids[np.r_[True, new_vehicle]]
+    if (len(set(block_vehicles)) == len(block_vehicles)
+            and not np.any(~new_vehicle & (timestamps[1:] < timestamps[:-1]))):
+        order = None
+    else:
+        # Each vehicle's timeline in timestamp order, vehicles in first-seen order.
+        # Small per-vehicle sorts on the raw timestamps beat one big sort on converted keys
+        by_vehicle = {}
+        for row, vid in enumerate(vehicle_ids.tolist()):
+            by_vehicle.setdefault(vid, []).append(row)
+        ts_list = timestamps.tolist()
+        order = []
+        for vehicle_rows in by_vehicle.values():
+            vehicle_rows.sort(key=ts_list.__getitem__)
+            order.extend(vehicle_rows)
+        order = np.array(order, dtype=np.intp)
+        vehicle_ids = vehicle_ids[order]
+        lat = lat[order]
+        lon = lon[order]
+        new_vehicle = vehicle_ids[1:] != vehicle_ids[:-1]
+    
+    # Integer microdegrees: exact for 6-decimal feed coordinates, no float subtraction artefacts at the boundary
+    lat_q = np.round(lat * MICRODEGREES).astype(np.int32)
+    lon_q = np.round(lon * MICRODEGREES).astype(np.int32)
+    tol = round(SAME_LOCATION_TOLERANCE_DEG * MICRODEGREES)
+    
+    # Points within tolerance of a run's first point are within 2x tolerance of each other,
+    # so runs never cross a step of 2x tolerance (or a change of vehicle)
+    breaks = (
+        new_vehicle
+        | (np.abs(np.diff(lat_q)) >= 2 * tol)
+        | (np.abs(np.diff(lon_q)) >= 2 * tol)
+    )
+    starts = np.flatnonzero(np.r_[True, breaks])
+    counts = np.diff(np.r_[starts, n])
+    
+    # A cluster whose points all stay within tolerance of its first point is a single run
+    anchor = np.repeat(starts, counts)
+    drifted = (np.abs(lat_q - lat_q[anchor]) >= tol) | (np.abs(lon_q - lon_q[anchor]) >= tol)
+    single = ~np.logical_or.reduceat(drifted, starts)
+    
+    run_starts = [starts[single]]
+    run_counts = [counts[single]]
+    
+    # Clusters that drift away from their first point are split with the anchored scan
+    split_starts = []
+    split_counts = []
+    for start, count in zip(starts[~single].tolist(), counts[~single].tolist()):
+        end = start + count
+        lats = lat_q[start:end].tolist()
+        lons = lon_q[start:end].tolist()
         i = 0
-        while i < len(positions):
-            current_lat = positions[i]['latitude']
-            current_lon = positions[i]['longitude']
-            current_ts = positions[i]['timestamp']
-            route_id = positions[i].get('route_id')
-            route_name = positions[i].get('route_name')
-            direction = positions[i].get('direction')
-            operator = positions[i].get('operator', 'Unknown')
-            
-            # Count consecutive positions at SAME location (within 5 meters)
-            dwell_count = 1
+        while i < count:
             j = i + 1
-            
-            while j < len(positions):
-                # Check if vehicle still at same location (within 5m tolerance)
-                lat_diff = abs(positions[j]['latitude'] - current_lat)
-                lon_diff = abs(positions[j]['longitude'] - current_lon)
-                
-                # Roughly 0.00005 degrees = ~5 meters
-                if lat_diff < 0.00005 and lon_diff < 0.00005:
-                    dwell_count += 1
-                    j += 1
-                else:
-                    # Vehicle moved - stop event ended
-                    break
-            
-            # If stopped for 2+ polls (20+ seconds), it's a stop event
-            if dwell_count >= 2:
-                stops.append({
-                    'vehicle_id': vehicle_id,
-                    'route_id': route_id,
-                    'route_name': route_name,
-                    'direction': direction,
-                    'operator': operator,
-                    'latitude': current_lat,
-                    'longitude': current_lon,
-                    'stop_timestamp': current_ts,  # First timestamp of stop
-                    'dwell_time_seconds': dwell_count * 10,
-                    'poll_count': dwell_count
-                })
-            
-            # Skip to next different location
-            i = j if j > i + 1 else i + 1
-    
-    return stops
+            while j < count and abs(lats[j] - lats[i]) < tol and abs(lons[j] - lons[i]) < tol:
+                j += 1
+            split_starts.append(start + i)
+            split_counts.append(j - i)
+            i = j
+    run_starts.append(np.asarray(split_starts, dtype=starts.dtype))
+    run_counts.append(np.asarray(split_counts, dtype=counts.dtype))
+    
+    # If stopped for 2+ polls (20+ seconds), it's a stop event
+    run_starts = np.concatenate(run_starts)
+    run_counts = np.concatenate(run_counts)
+    is_stop = run_counts >= 2
+    event_order = np.argsort(run_starts[is_stop], kind='stable')
+    event_starts = run_starts[is_stop][event_order]
+    poll_counts = run_counts[is_stop][event_order]
+    rows = event_starts if order is None else order[event_starts]
+    events = [vehicle_positions[r] for r in rows.tolist()]
+    
+    def field(key, default=None):
+        return np.fromiter((pos.get(key, default) for pos in events), dtype=object, count=len(events))
+    
+    return StopEvents(
+        vehicle_ids=vehicle_ids[event_starts],
+        route_ids=field('route_id'),
+        route_names=field('route_name'),
+        directions=field('direction'),
+        operators=field('operator', 'Unknown'),
+        lats=lat[event_starts],
+        lons=lon[event_starts],
+        timestamps=timestamps[rows],
+        poll_counts=poll_counts.astype(np.int64)
+    )
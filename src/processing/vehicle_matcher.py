@@ -7,7 +7,40 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.api.database import get_db_connection
+from src.api.database import pooled_connection
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _nearest_stop_query(direction: bool) -> str:
+    """Build the nearest route-stop query with or without a direction filter (cached)"""
+    query = """
+        SELECT
+            s.naptan_id,
+            s.stop_name,
+            ST_Distance(
+                s.geog,
+                ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)::geography
+            ) as distance
+        FROM txc_stops s
+        JOIN txc_pattern_stops ps ON s.naptan_id = ps.naptan_id
+        JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
+        WHERE rp.route_name = %(route_name)s
+    """
+    
+    if direction:
+        query += " AND rp.direction = %(direction)s"
+    
+    # KNN ordering lets PostGIS walk the geog GiST index nearest-first instead of sorting candidates
+    return query + """
+          AND ST_DWithin(
+              s.geog,
+              ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)::geography,
+              %(radius_m)s
+          )
+        ORDER BY s.geog <-> ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)::geography
+        LIMIT 1
+    """
 
 
 def find_nearest_stop_for_route_postgis(lat: float, lon: float, route_name: str, direction: str = None, radius_m: float = 30.0):
@@ -15,67 +48,27 @@ def find_nearest_stop_for_route_postgis(lat: float, lon: float, route_name: str,
     Find nearest stop using PostGIS spatial index
     MUCH faster than haversine loop - uses native database spatial queries
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    try:
-        # Build query with direction filter if provided
-        if direction:
-            query = """
-                SELECT DISTINCT
-                    s.naptan_id,
-                    s.stop_name,
-                    ST_Distance(
-                        s.geog,
-                        ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography
-                    ) as distance
-                FROM txc_stops s
-                JOIN txc_pattern_stops ps ON s.naptan_id = ps.naptan_id
-                JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
-                WHERE rp.route_name = %s 
-                  AND rp.direction = %s
-                  AND ST_DWithin(
-                      s.geog,
-                      ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography,
-                      %s
-                  )
-                ORDER BY distance
-                LIMIT 1
-            """
-            cur.execute(query, (lon, lat, route_name, direction, lon, lat, radius_m))
-        else:
-            # Fallback: no direction filter
-            query = """
-                SELECT DISTINCT
-                    s.naptan_id,
-                    s.stop_name,
-                    ST_Distance(
-                        s.geog,
-                        ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography
-                    ) as distance
-                FROM txc_stops s
-                JOIN txc_pattern_stops ps ON s.naptan_id = ps.naptan_id
-                JOIN txc_route_patterns rp ON ps.pattern_id = rp.pattern_id
-                WHERE rp.route_name = %s
-                  AND ST_DWithin(
-                      s.geog,
-                      ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography,
-                      %s
-                  )
-                ORDER BY distance
-                LIMIT 1
-            """
-            cur.execute(query, (lon, lat, route_name, lon, lat, radius_m))
-        
-        result = cur.fetchone()
-        
-        if result:
-            return (result['naptan_id'], result['stop_name'], result['distance'])
-        return None
+    with pooled_connection() as conn:
+        cur = conn.cursor()
         
-    finally:
-        cur.close()
-        conn.close()
+        try:
+            # Direction filter only when known, so the route/direction index stays usable
+            cur.execute(_nearest_stop_query(bool(direction)), {
+                'lat': lat,
+                'lon': lon,
+                'route_name': route_name,
+                'direction': direction,
+                'radius_m': radius_m,
+            })
+            
+            result = cur.fetchone()
+            
+            if result:
+                return (result['naptan_id'], result['stop_name'], result['distance'])
+            return None
+            
+        finally:
+            cur.close()
 
 
 def match_vehicle_to_stop(vehicle_position: dict) -> dict:
@@ -0,0 +1,85 @@
+"""
+Connection pool behaviour when every connection is checked out
+"""
+
+import threading
+import time
+import unittest
+
+try:
+    from psycopg2.pool import PoolError
+    from src.api import database
+    HAS_DB_DEPS = True
+except ImportError:
+    HAS_DB_DEPS = False
+
+
+class FakeConnection:
+    closed = 0
+    autocommit = False
+
+
+class FakePool:
+    """Mimics ThreadedConnectionPool: raises as soon as maxconn are checked out"""
+
+    def __init__(self, maxconn):
+        self.maxconn = maxconn
+        self.in_use = 0
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        with self.lock:
+            if self.in_use >= self.maxconn:
+                raise PoolError("connection pool exhausted")
+            self.in_use += 1
+            return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        with self.lock:
+            self.in_use -= 1
+
+
+@unittest.skipUnless(HAS_DB_DEPS, "psycopg2/python-dotenv not installed")
+class PooledConnectionExhaustedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = (database._pool, database._pool_slots, database.POOL_TIMEOUT)
+        database._pool = FakePool(1)
+        database._pool_slots = threading.BoundedSemaphore(1)
+
+    def tearDown(self):
+        database._pool, database._pool_slots, database.POOL_TIMEOUT = self.saved
+
+    def test_waits_for_a_free_connection(self):
+        database.POOL_TIMEOUT = 5
+        holding = threading.Event()
+        got_second = []
+
+        def hold_connection():
+            with database.pooled_connection():
+                holding.set()
+                time.sleep(0.2)
+
+        holder = threading.Thread(target=hold_connection)
+        holder.start()
+        holding.wait()
+
+        # Pool is exhausted here; this must block until the holder returns its connection
+        with database.pooled_connection() as conn:
+            got_second.append(conn)
+
+        holder.join()
+        self.assertEqual(len(got_second), 1)
+        self.assertEqual(database._pool.in_use, 0)
+
+    def test_times_out_with_pool_error(self):
+        database.POOL_TIMEOUT = 0.05
+        with database.pooled_connection():
+            with self.assertRaises(PoolError):
+                with database.pooled_connection():
+                    pass
+        self.assertEqual(database._pool.in_use, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()